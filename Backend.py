@@ -0,0 +1,73 @@
+# Interface between Model and a solver library. A backend wraps one native model, and is picked once when the Model is
+# created, so the constraint loops never check which solver they're building for. Backends can bind native methods as
+# instance attributes instead of implementing them, as long as the signatures below are kept.
+# New backends are made available with Model.register_backend
+class Backend:
+    # Solve statuses, as returned in Solve's 'status'
+    OPTIMAL = None
+    FEASIBLE = None
+
+    # File extension of saved models, used by the model cache
+    EXTENSION = None
+
+    def NewIntVar(self, min, max, identifier):
+        raise NotImplementedError
+
+    def NewBoolVar(self, identifier):
+        raise NotImplementedError
+
+    def Not(self, b):
+        raise NotImplementedError
+
+    # Whether var can only be 0 or 1, so that it can be used as a literal
+    def IsBoolean(self, var) -> bool:
+        raise NotImplementedError
+
+    def Add(self, expr):
+        raise NotImplementedError
+
+    # Adds expr, only enforced when all literals hold
+    def AddIf(self, expr, literals : list):
+        raise NotImplementedError
+
+    # expressions[index] == target
+    def AddElement(self, index, expressions : list, target):
+        raise NotImplementedError
+
+    def AddAllDifferent(self, expressions : list):
+        raise NotImplementedError
+
+    def AddHint(self, var, value : int):
+        raise NotImplementedError
+
+    def ClearHints(self):
+        raise NotImplementedError
+
+    # Restricts each variable to its value, until Unfix. Used to re-solve a neighbourhood of a solution on the same model
+    def Fix(self, variables : list, values : list):
+        raise NotImplementedError
+
+    def Unfix(self):
+        raise NotImplementedError
+
+    def Maximize(self, expr):
+        raise NotImplementedError
+
+    def Save(self, path : str):
+        raise NotImplementedError
+
+    # Replaces the native model with the one in path. Returns a function (identifier, boolean) -> variable handing out
+    # its variables in the order they were created
+    def Load(self, path : str):
+        raise NotImplementedError
+
+    # Values in the current solution: set by Solve, and by the intermediate solutions passed to on_solution
+    def Value(self, expr) -> int:
+        raise NotImplementedError
+
+    def Values(self, variables : list) -> list:
+        raise NotImplementedError
+
+    # See Model.Solve. Returns the status, wall time and objective
+    def Solve(self, max_time, execfile, seed, workers, lns, portfolio, parameters : dict, on_solution) -> dict:
+        raise NotImplementedError
@@ -0,0 +1,77 @@
+import json
+import tracemalloc
+from contextlib import contextmanager
+from timeit import default_timer as timer
+
+from Model import Model
+
+# Records, for each family of variables and constraints added to a model, its build time, the number of variables and
+# constraints it created, and the peak memory (traced by tracemalloc) it reached above what was allocated before it.
+# Disabled profiles only run the families, as tracing allocations slows the build down noticeably
+class BuildProfile:
+    def __init__(self, model : Model, enabled : bool = True) -> None:
+        self.model = model
+        self.enabled = enabled
+        self.families = []
+
+        if enabled:
+            self.started_tracing = not tracemalloc.is_tracing()
+            if self.started_tracing:
+                tracemalloc.start()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+            self.peak_memory = 0
+            self.memory = 0
+
+    @contextmanager
+    def family(self, name : str):
+        if not self.enabled:
+            yield
+            return
+
+        variables, constraints = self.model.variables_created, self.model.constraints_added
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = timer()
+
+        yield
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_memory = max(self.peak_memory, peak - self.baseline)
+        self.memory = current - self.baseline
+        self.families.append({
+            "family": name,
+            "time": timer() - start,
+            "variables": self.model.variables_created - variables,
+            "constraints": self.model.constraints_added - constraints,
+            "peak_memory": peak - memory
+        })
+
+    def stop(self):
+        if self.enabled and self.started_tracing:
+            tracemalloc.stop()
+
+    def report(self, **context) -> dict:
+        return {
+            **context,
+            "families": self.families,
+            "total": {
+                "time": sum(family["time"] for family in self.families),
+                "variables": sum(family["variables"] for family in self.families),
+                "constraints": sum(family["constraints"] for family in self.families),
+                "peak_memory": self.peak_memory,
+                "memory": self.memory
+            }
+        }
+
+    def print_table(self):
+        print(f"{'Family':20} | {'Time (s)':>9} | {'Variables':>9} | {'Constraints':>11} | {'Peak memory (MB)':>16}")
+        for family in sorted(self.families, key=lambda family: -family["time"]):
+            print(f"{family['family']:20} | {family['time']:9.4f} | {family['variables']:9} | {family['constraints']:11} | {family['peak_memory'] / 2**20:16.2f}")
+
+        total = self.report()["total"]
+        print(f"{'total':20} | {total['time']:9.4f} | {total['variables']:9} | {total['constraints']:11} | {total['peak_memory'] / 2**20:16.2f}")
+        print(f"Memory held after the build (MB): {total['memory'] / 2**20:.2f}")
+
+    def save(self, path : str, **context):
+        with open(path, "w") as f:
+            json.dump(self.report(**context), f, indent=4)
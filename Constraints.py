@@ -40,26 +40,16 @@ def c6(model : Model, matrix : ContainerMatrix):
     outs = matrix.decision_get_range(None, "out",  None, None)
 
     for i, o in zip(ins, outs):
-        b = model.NewBoolVar('b')
-
-        model.AddIf(i == 1, b)
-        model.AddIf(i == 0, model.Not(b))
-        # This is a bit scuffed: b is True -> i == 1, b is False -> i == 0
-        # Therefore, b <=> (i == 1)
-
-        model.AddIf(o == 0, b)
+        model.AddIf(o == 0, model.literal_for(i))
 
 # An 'out' must be put on a place where a container exists, on a given time t
 def c7(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for s in range(matrix.s):
             for h in range(matrix.h):
-                b = model.NewBoolVar('b')
                 out = matrix.decision_get(t, "out", s, h)
-                model.AddIf(out == 1, b)
-                model.AddIf(out == 0, model.Not(b))
 
-                model.AddIf(sum(matrix.get_range(t, None, s, h)) == out, b)
+                model.AddIf(sum(matrix.get_range(t, None, s, h)) == out, model.literal_for(out))
 
 # When a 'remove'  action is chosen, the number of 'live' containers is reduced   by one (1)
 # When an 'insert' action is chosen, the number of 'live' containers is increased by one (1)
@@ -71,20 +61,18 @@ def c9(model : Model, matrix : ContainerMatrix):
 def c10(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for c in range(matrix.c):
-            not_insert = model.NewBoolVar('b')
-            model.AddIf(matrix.insert[t] == 0, not_insert)
-            model.AddIf(matrix.insert[t] == 1, model.Not(not_insert))
+            not_insert = model.Not(model.literal_for(matrix.insert[t]))
             model.AddIf(matrix.lifetime[t][c] >= matrix.lifetime[t + 1][c], not_insert)
 
 # If the action 'idle' is chosen, everything stays the same
 def c11(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for c in range(matrix.c):
+            if not (matrix.live[t, c] or matrix.live[t + 1, c]):
+                continue # Container is out of the yard throughout
             for s in range(matrix.s):
                 for h in range(matrix.h):
-                    b = model.NewBoolVar('b')
-                    model.AddIf(matrix.idle[t] == 1, b)
-                    model.AddIf(matrix.idle[t] == 0, model.Not(b))
+                    b = model.literal_for(matrix.idle[t])
 
                     model.AddIf(matrix.get(t, c, s, h) == matrix.get(t + 1, c, s, h), b)
 
@@ -92,15 +80,12 @@ def c11(model : Model, matrix : ContainerMatrix):
 def c12(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for c in range(matrix.c):
+            if not (matrix.live[t, c] or matrix.live[t + 1, c]):
+                continue # Container is out of the yard throughout
             for s in range(matrix.s):
                 for h in range(matrix.h):
-                    b = model.NewBoolVar('b')
-                    model.AddIf(matrix.remove[t] == 1, b)
-                    model.AddIf(matrix.remove[t] == 0, model.Not(b))
-
-                    b1 = model.NewBoolVar('b1')
-                    model.AddIf(matrix.decision_get(t, "out", s, h) == 1, b1)
-                    model.AddIf(matrix.decision_get(t, "out", s, h) == 0, model.Not(b1))
+                    b = model.literal_for(matrix.remove[t])
+                    b1 = model.literal_for(matrix.decision_get(t, "out", s, h))
 
                     model.AddIf(matrix.get(t, c, s, h) == matrix.get(t + 1, c, s, h), b, model.Not(b1))
 
@@ -108,19 +93,13 @@ def c12(model : Model, matrix : ContainerMatrix):
 def c13(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for c in range(matrix.c):
+            if not (matrix.live[t, c] or matrix.live[t + 1, c]):
+                continue # Container is out of the yard throughout
             for s in range(matrix.s):
                 for h in range(matrix.h):
-                    b = model.NewBoolVar('b')
-                    model.AddIf(matrix.emplace[t] == 1, b)
-                    model.AddIf(matrix.emplace[t] == 0, model.Not(b))
-
-                    b1 = model.NewBoolVar('b1')
-                    model.AddIf(matrix.get(t, c, s, h) == 1, b1)
-                    model.AddIf(matrix.get(t, c, s, h) == 0, model.Not(b1))
-
-                    b2 = model.NewBoolVar('b2')
-                    model.AddIf(matrix.decision_get(t, "in", s, h) == 1, b2)
-                    model.AddIf(matrix.decision_get(t, "in", s, h) == 0, model.Not(b2))
+                    b = model.literal_for(matrix.emplace[t])
+                    b1 = model.literal_for(matrix.get(t, c, s, h))
+                    b2 = model.literal_for(matrix.decision_get(t, "in", s, h))
 
                     model.AddIf(matrix.get(t + 1, c, s, h) == 0, b, model.Not(b1), model.Not(b2))
 
@@ -129,13 +108,8 @@ def c14(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for s in range(matrix.s):
             for h in range(matrix.h):
-                b = model.NewBoolVar('b')
-                model.AddIf(matrix.emplace[t] == 1, b)
-                model.AddIf(matrix.emplace[t] == 0, model.Not(b))
-
-                b1 = model.NewBoolVar('b1')
-                model.AddIf(matrix.decision_get(t, "in", s, h) == 1, b1)
-                model.AddIf(matrix.decision_get(t, "in", s, h) == 0, model.Not(b1))
+                b = model.literal_for(matrix.emplace[t])
+                b1 = model.literal_for(matrix.decision_get(t, "in", s, h))
 
                 model.AddIf(sum(matrix.get_range(t, None, s, h))     == 0, b, b1)
                 model.AddIf(sum(matrix.get_range(t + 1, None, s, h)) == 1, b, b1)
@@ -145,13 +119,8 @@ def c15(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for s in range(matrix.s):
             for h in range(matrix.h):
-                b = model.NewBoolVar('b')
-                model.AddIf(matrix.emplace[t] == 1, b)
-                model.AddIf(matrix.emplace[t] == 0, model.Not(b))
-
-                b1 = model.NewBoolVar('b1')
-                model.AddIf(matrix.decision_get(t, "out", s, h) == 1, b1)
-                model.AddIf(matrix.decision_get(t, "out", s, h) == 0, model.Not(b1))
+                b = model.literal_for(matrix.emplace[t])
+                b1 = model.literal_for(matrix.decision_get(t, "out", s, h))
 
                 model.AddIf(sum(matrix.get_range(t, None, s, h))     == 1, b, b1)
                 model.AddIf(sum(matrix.get_range(t + 1, None, s, h)) == 0, b, b1)
@@ -161,14 +130,45 @@ def c15(model : Model, matrix : ContainerMatrix):
 def c16(model : Model, matrix : ContainerMatrix):
     for t in range(matrix.t - 1):
         for c in range(matrix.c):
+            if not (matrix.live[t, c] or matrix.live[t + 1, c]):
+                continue # Container is out of the yard throughout
             for s in range(matrix.s):
                 for h in range(matrix.h):
-                    insert = model.NewBoolVar('b')
-                    model.AddIf(matrix.insert[t] == 1, insert)
-                    model.AddIf(matrix.insert[t] == 0, model.Not(insert))
+                    insert = model.literal_for(matrix.insert[t])
+                    b1 = model.literal_for(matrix.decision_get(t, "in", s, h))
+
+                    model.AddIf(matrix.get(t, c, s, h) == matrix.get(t + 1, c, s, h), insert, model.Not(b1))
 
-                    b1 = model.NewBoolVar('b1')
-                    model.AddIf(matrix.decision_get(t, "in", s, h) == 1, b1)
-                    model.AddIf(matrix.decision_get(t, "in", s, h) == 0, model.Not(b1))
+# Families taking extra input data, which the main constraint loop skips. The weight order is applied with weights, and
+# the symmetry breaking families only with -symmetry
 
-                    model.AddIf(matrix.get(t, c, s, h) == matrix.get(t + 1, c, s, h), insert, model.Not(b1))
\ No newline at end of file
+# An empty place weighs 0, and floating containers are already forbidden (c3), so ensuring that
+# each place is at least as heavy as the one above it means everything below is at least this heavy
+def weight_order(model : Model, matrix : ContainerMatrix, class_array):
+    for t in range(matrix.t):
+        for s in range(matrix.s):
+            for h in range(1, matrix.h):
+                below = matrix.get_range(t, None, s, h - 1)
+                above = matrix.get_range(t, None, s, h)
+                model.Add(
+                    sum(weight * v for weight, v in zip(class_array, below)) >= sum(weight * v for weight, v in zip(class_array, above))
+                )
+
+# Stacks that start empty are interchangeable: the later one of each pair can only hold a container once the earlier one has been used
+def symmetry_empty_stacks(model : Model, matrix : ContainerMatrix, empty_stacks):
+    for first, second in zip(empty_stacks, empty_stacks[1:]):
+        used = 0
+        for t in range(matrix.t):
+            # used_now can only be true if the first stack was used at or before t
+            used_now = model.NewBoolVar('u')
+            model.Add(used_now <= used + sum(matrix.get_range(t, None, first, 0)))
+            model.Add(sum(matrix.get_range(t, None, second, 0)) <= used_now)
+            used = used_now
+
+# Containers with the same weight, that arrive and leave with the same shipments, are interchangeable: within each group, they arrive in order
+def symmetry_identical_containers(model : Model, matrix : ContainerMatrix, groups, arrival_windows):
+    for group in groups:
+        for first, second in zip(group, group[1:]):
+            start, end = arrival_windows[first]
+            for t in range(start, end):
+                model.Add(matrix.lifetime[t][first] >= matrix.lifetime[t][second])
@@ -0,0 +1,136 @@
+import os
+from timeit import default_timer as timer
+
+from docplex.cp.model import CpoModel
+from docplex.cp.solution import CpoModelSolution, SOLVE_STATUS_OPTIMAL, SOLVE_STATUS_FEASIBLE
+
+from Backend import Backend
+
+class CplexBackend(Backend):
+    OPTIMAL = SOLVE_STATUS_OPTIMAL
+    FEASIBLE = SOLVE_STATUS_FEASIBLE
+    EXTENSION = '.cpo'
+
+    def __init__(self) -> None:
+        self.model = CpoModel()
+        self.fixed = []
+
+    def NewIntVar(self, min, max, identifier):
+        return self.model.integer_var(min, max, identifier)
+
+    def NewBoolVar(self, identifier):
+        return self.model.binary_var(identifier)
+
+    def Not(self, b):
+        return 1 - b
+
+    def IsBoolean(self, var) -> bool:
+        return var.is_binary()
+
+    def Add(self, expr):
+        return self.model.add(expr)
+
+    def AddIf(self, expr, literals : list):
+        return self.model.add(self.model.if_then(sum(literals) == len(literals), expr))
+
+    def AddElement(self, index, expressions : list, target):
+        return self.model.add(self.model.element(expressions, index) == target)
+
+    def AddAllDifferent(self, expressions : list):
+        return self.model.add(self.model.all_diff(expressions))
+
+    def AddHint(self, var, value : int):
+        if self.model.get_starting_point() is None:
+            self.model.set_starting_point(CpoModelSolution())
+        return self.model.get_starting_point().add_integer_var_solution(var, value)
+
+    def ClearHints(self):
+        self.model.set_starting_point(None)
+
+    def Fix(self, variables : list, values : list):
+        constraints = [v == value for v, value in zip(variables, values)]
+        self.model.add(constraints)
+        self.fixed += constraints
+
+    def Unfix(self):
+        self.model.remove(self.fixed)
+        self.fixed = []
+
+    def Maximize(self, expr):
+        return self.model.add(self.model.maximize(expr))
+
+    def Save(self, path : str):
+        return self.model.export_model(path)
+
+    def Load(self, path : str):
+        self.model = CpoModel()
+        self.model.import_model(path)
+
+        variables = {v.get_name() : v for v in self.model.get_all_variables()}
+        def replay(identifier, boolean):
+            return variables[identifier]
+        return replay
+
+    def Value(self, expr) -> int:
+        return self.values.get_value(expr)
+
+    def Values(self, variables : list) -> list:
+        solution = {v.get_name() : v.get_value() for v in self.values.get_all_var_solutions()}
+        return [solution[v.get_name()] for v in variables]
+
+    def Solve(self, max_time, execfile, seed, workers, lns, portfolio, parameters : dict, on_solution) -> dict:
+        if portfolio:
+            raise Exception("Search portfolios are only supported by ortools")
+
+        if seed is not None:
+            parameters["RandomSeed"] = seed
+        if workers is not None:
+            parameters["Workers"] = workers
+        # CP Optimizer's 'Restart' search is its large neighbourhood search
+        if lns == 'off':
+            parameters["SearchType"] = "DepthFirst"
+        elif lns == 'only':
+            parameters["SearchType"] = "Restart"
+
+        if on_solution is None:
+            self.solver = self.model.solve(execfile=execfile,
+             TimeLimit=max_time,
+             log_output=open(os.devnull,"w"),
+             **parameters)
+            self.values = self.solver
+        else:
+            self.solve_with_callback(on_solution, execfile=execfile,
+             TimeLimit=max_time,
+             log_output=open(os.devnull,"w"),
+             **parameters)
+
+        return {
+            "status": self.solver.get_solve_status(),
+            "time": self.solver.get_solve_time(),
+            "objective": sum(self.solver.get_objective_values()) if self.solver.get_objective_values() else None
+        }
+
+    def solve_with_callback(self, on_solution, **parameters):
+        # CP Optimizer yields each improving solution from its search iterator
+        search = self.model.start_search(**parameters)
+        start = timer()
+        last_solution = None
+
+        for number, result in enumerate(search, start=1):
+            last_solution = result
+            self.values = result
+            stop = on_solution({
+                "solution": number,
+                "objective": sum(result.get_objective_values()),
+                "bound": sum(result.get_objective_bounds()) if result.get_objective_bounds() else None,
+                "time": timer() - start
+            })
+            if stop:
+                search.abort_search()
+                break
+
+        # The final result holds the status of the whole search, but only holds values if it is itself a solution
+        self.solver = search.get_last_result()
+        if last_solution is not None and not self.solver.is_solution():
+            self.solver = last_solution
+        self.values = self.solver
@@ -0,0 +1,46 @@
+from math import inf
+from typing import List
+
+# Lower bounds on the emplaces of any plan, from the initial stacking and the out lists. A container that starts above
+# one that leaves before it has to be moved out of the way at least once, before the end of the ship that takes the one
+# under it. Containers above it that leave with the same ship are removed first instead. Only initial containers are
+# counted, as where the arriving ones go is up to the plan
+
+# The shipment by which each initial container must have been emplaced at least once, for those that block one
+def blocking_deadlines(initial_container_positions : list, shipments : List[dict]) -> dict:
+    departures = {}
+    for k, shipment in enumerate(shipments):
+        for label in shipment.get("out", []):
+            departures.setdefault(label, k)
+
+    stacks = {}
+    for label, s, h in initial_container_positions:
+        stacks.setdefault(s, []).append((h, label))
+
+    deadlines = {}
+    for stack in stacks.values():
+        earliest = inf # Earliest departure of the containers below
+        for _, label in sorted(stack):
+            departure = departures.get(label, inf)
+            if earliest < departure:
+                deadlines[label] = earliest
+            earliest = min(earliest, departure)
+    return deadlines
+
+# For every ship: the start and end of its window of actions, the emplaces that must be done by its end, and how many
+# of the actions before its end are in gaps, where emplaces don't hold up a ship
+def emplace_lower_bounds(initial_container_positions : list, shipments : List[dict]) -> List[dict]:
+    deadlines = list(blocking_deadlines(initial_container_positions, shipments).values())
+    actions = sum(shipment["duration"] for shipment in shipments) - 1
+
+    bounds = []
+    start = 0
+    gap_actions = 0
+    for k, shipment in enumerate(shipments):
+        end = min(start + shipment["duration"], actions)
+        if "in" in shipment:
+            bounds.append({"shipment": k, "start": start, "end": end, "emplaces": sum(deadline <= k for deadline in deadlines), "gap_actions": gap_actions})
+        else:
+            gap_actions += end - start
+        start += shipment["duration"]
+    return bounds
@@ -0,0 +1,146 @@
+from typing import List, Union
+
+import numpy
+
+from Plan import Plan, IDLE, EMPLACE, REMOVE, INSERT, EMPTY
+
+class Yard:
+    def __init__(self, stacks : List[List[int]], height : int, weight_array : List[int]) -> None:
+        self.stacks = stacks
+        self.height = height
+        self.weight_array = weight_array
+        self.steps = []
+
+    def stack_of(self, container : int) -> int:
+        for s, stack in enumerate(self.stacks):
+            if container in stack:
+                return s
+
+    def blockers(self, container : int) -> int:
+        stack = self.stacks[self.stack_of(container)]
+        return len(stack) - stack.index(container) - 1
+
+    def fits(self, container : int, s : int) -> bool:
+        stack = self.stacks[s]
+        return len(stack) < self.height and (not stack or self.weight_array[stack[-1]] >= self.weight_array[container])
+
+    def relocation_target(self, container : int, source : int, avoid : set) -> Union[int, None]:
+        candidates = [s for s in range(len(self.stacks)) if s != source and self.fits(container, s)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: (any(c in avoid for c in self.stacks[s]), len(self.stacks[s])))
+
+    # Each step records the yard state right after it, so the plan can be laid out on the timeline later
+    def record(self, action : int, move : tuple):
+        self.steps.append((action, move, [list(stack) for stack in self.stacks]))
+
+    def emplace(self, source : int, target : int):
+        container = self.stacks[source].pop()
+        move = (source, len(self.stacks[source]), target, len(self.stacks[target]))
+        self.stacks[target].append(container)
+        self.record(EMPLACE, move)
+
+    def remove(self, source : int):
+        self.stacks[source].pop()
+        self.record(REMOVE, (source, len(self.stacks[source]), EMPTY, EMPTY))
+
+    def insert(self, container : int, target : int):
+        self.stacks[target].append(container)
+        self.record(INSERT, (EMPTY, EMPTY, target, len(self.stacks[target]) - 1))
+
+def unload(yard : Yard, pending : set) -> bool:
+    if any(yard.stack_of(container) is None for container in pending):
+        return False
+
+    while pending:
+        target = min(pending, key=yard.blockers)
+        s = yard.stack_of(target)
+
+        while yard.stacks[s][-1] != target:
+            top = yard.stacks[s][-1]
+            if top in pending:
+                # A blocker that is leaving anyway is removed instead of relocated
+                yard.remove(s)
+                pending.discard(top)
+                continue
+
+            destination = yard.relocation_target(top, s, pending)
+            if destination is None:
+                return False
+            yard.emplace(s, destination)
+
+        yard.remove(s)
+        pending.discard(target)
+    return True
+
+def load(yard : Yard, containers : List[int]) -> bool:
+    for container in sorted(containers, key=lambda c: -yard.weight_array[c]):
+        candidates = [s for s in range(len(yard.stacks)) if yard.fits(container, s)]
+        if not candidates:
+            return False
+        yard.insert(container, min(candidates, key=lambda s: len(yard.stacks[s])))
+    return True
+
+def premarshal(yard : Yard, upcoming : set, budget : int):
+    upcoming = {container for container in upcoming if yard.stack_of(container) is not None}
+    for target in sorted(upcoming, key=yard.blockers):
+        s = yard.stack_of(target)
+        while yard.stacks[s][-1] != target and yard.stacks[s][-1] not in upcoming:
+            if len(yard.steps) >= budget:
+                return
+            destination = yard.relocation_target(yard.stacks[s][-1], s, upcoming)
+            if destination is None or any(c in upcoming for c in yard.stacks[destination]):
+                break
+            yard.emplace(s, destination)
+
+# Constructive heuristic: plays the shipments out on an explicit yard, one action per timestep.
+# Each ship removes its 'out' containers (fewest blockers first, relocating blockers to the least full stack that
+# doesn't bury another 'out' container) and then inserts its 'in' containers heaviest first. Gaps between ships are
+# spent relocating the blockers of the next ship's 'out' containers. Returns None if the heuristic gets stuck
+def greedy_plan(initial_container_positions : list, shipments : List[dict], weights, index_lookup : dict, length : int, height : int) -> Union[Plan, None]:
+    weights = {label:1 for label in index_lookup} if weights == False else weights
+    weight_array = [0] * len(index_lookup)
+    for c, weight in weights.items():
+        weight_array[index_lookup[c]] = weight
+
+    stacks = [[] for _ in range(length)]
+    for label, s, h in sorted(initial_container_positions, key=lambda position: position[2]):
+        stacks[s].append(index_lookup[label])
+
+    time = sum(shipment["duration"] for shipment in shipments)
+    grid = numpy.full((time, length, height), EMPTY, dtype=numpy.int16)
+    actions = numpy.full(time - 1, IDLE, dtype=numpy.int8)
+    moves = numpy.full((time - 1, 4), EMPTY, dtype=numpy.int16)
+
+    def fill_grid(t, stacks):
+        for s, stack in enumerate(stacks):
+            grid[t, s, :len(stack)] = stack
+
+    fill_grid(0, stacks)
+    t = 0
+    for i, shipment in enumerate(shipments):
+        # The last timestep of the horizon has no action after it
+        budget = shipment["duration"] - (1 if i == len(shipments) - 1 else 0)
+        yard = Yard(stacks, height, weight_array)
+
+        if "in" in shipment:
+            if not unload(yard, {index_lookup[c] for c in shipment["out"]}):
+                return None
+            if not load(yard, [index_lookup[c] for c in shipment["in"]]):
+                return None
+        else:
+            upcoming = next((s for s in shipments[i + 1:] if "in" in s), None)
+            if upcoming is not None:
+                premarshal(yard, {index_lookup[c] for c in upcoming["out"]}, budget)
+
+        if len(yard.steps) > budget:
+            return None
+
+        for step in range(budget):
+            if step < len(yard.steps):
+                actions[t], moves[t], state = yard.steps[step]
+                stacks = state
+            fill_grid(t + 1, stacks)
+            t += 1
+
+    return Plan(grid, actions, moves, len(index_lookup))
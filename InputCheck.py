@@ -0,0 +1,171 @@
+from numbers import Number
+from typing import List
+
+from EmplaceBounds import emplace_lower_bounds
+
+# Fast checks of an input problem, that catch inputs the model can't solve before it's built. They only look at the
+# manifests, so passing them doesn't mean there is a plan, but every problem they report means there isn't one
+
+def is_count(x) -> bool:
+    return isinstance(x, int) and not isinstance(x, bool)
+
+def structure_problems(data) -> List[str]:
+    if not isinstance(data, dict):
+        return ["the input must be an object with 'containers', 'dimensions' and 'shipments'"]
+    problems = [f"'{key}' is missing" for key in ("containers", "dimensions", "shipments") if key not in data]
+    if problems:
+        return problems
+
+    dimensions = data["dimensions"]
+    if not isinstance(dimensions, list) or len(dimensions) != 2 or not all(is_count(d) and d > 0 for d in dimensions):
+        problems.append(f"'dimensions' must be [stacks, tiers], two positive integers, not {dimensions}")
+
+    if not isinstance(data["containers"], list):
+        problems.append("'containers' must be a list of [label, stack, tier]")
+    else:
+        for container in data["containers"]:
+            if not isinstance(container, list) or len(container) != 3 or not isinstance(container[0], str) or not all(is_count(x) for x in container[1:]):
+                problems.append(f"initial container {container} must be [label, stack, tier]")
+
+    shipments = data["shipments"]
+    if not isinstance(shipments, list) or not shipments:
+        problems.append("'shipments' must be a non-empty list")
+        return problems
+    for k, shipment in enumerate(shipments):
+        if not isinstance(shipment, dict):
+            problems.append(f"shipment {k} must be an object")
+            continue
+        if not is_count(shipment.get("duration")) or shipment["duration"] <= 0:
+            problems.append(f"shipment {k} needs a positive integer 'duration', not {shipment.get('duration')}")
+        if ("in" in shipment) != ("out" in shipment):
+            problems.append(f"shipment {k} has {'an' if 'in' in shipment else 'no'} 'in' list but {'an' if 'out' in shipment else 'no'} 'out' list: a ship needs both, a gap neither")
+        for movement in ("in", "out"):
+            if movement in shipment and (not isinstance(shipment[movement], list) or not all(isinstance(c, str) for c in shipment[movement])):
+                problems.append(f"shipment {k} '{movement}' must be a list of container labels")
+
+    if "weights" in data:
+        weights = data["weights"]
+        if not isinstance(weights, dict) or not all(isinstance(w, Number) and not isinstance(w, bool) for w in weights.values()):
+            problems.append("'weights' must map container labels to numbers")
+    return problems
+
+# Initial containers must be inside the yard, one per slot, and stand on the ground or on another container
+def yard_problems(data : dict) -> List[str]:
+    stacks, tiers = data["dimensions"]
+    problems = []
+    slots = {}
+    for label, s, h in data["containers"]:
+        if not (0 <= s < stacks and 0 <= h < tiers):
+            problems.append(f"container '{label}' starts at stack {s} tier {h}, outside the {stacks}x{tiers} yard")
+        elif (s, h) in slots:
+            problems.append(f"containers '{slots[(s, h)]}' and '{label}' both start at stack {s} tier {h}")
+        else:
+            slots[(s, h)] = label
+
+    for (s, h), label in slots.items():
+        if h > 0 and (s, h - 1) not in slots:
+            problems.append(f"container '{label}' starts floating at stack {s} tier {h}, with nothing under it")
+    return problems
+
+# Every container arrives once, and can only leave once it's in the yard. The lifetime windows of the model let a
+# container leave from the first shipment if it starts in the yard, and from the second one after its arrival otherwise
+def label_problems(data : dict) -> List[str]:
+    problems = []
+    arrival = {}
+    for label, _, _ in data["containers"]:
+        if label in arrival:
+            problems.append(f"container '{label}' starts in the yard twice")
+        arrival[label] = -2
+
+    departure = {}
+    for k, shipment in enumerate(data["shipments"]):
+        for label in shipment.get("out", []):
+            if label in departure:
+                problems.append(f"container '{label}' leaves with shipment {k}, but already left with shipment {departure[label]}")
+            elif label not in arrival:
+                problems.append(f"container '{label}' leaves with shipment {k}, but doesn't arrive before it")
+            elif k < arrival[label] + 2:
+                problems.append(f"container '{label}' leaves with shipment {k}, but arrives with shipment {arrival[label]}: it can only leave from shipment {arrival[label] + 2}")
+            departure.setdefault(label, k)
+
+        for label in shipment.get("in", []):
+            if label in arrival:
+                where = "starts in the yard" if arrival[label] < 0 else f"already arrives with shipment {arrival[label]}"
+                problems.append(f"container '{label}' arrives with shipment {k}, but {where}")
+            else:
+                arrival[label] = k
+    return problems
+
+# Weights can only be given to containers of the input, the others weigh 0 (as in enforce_weight_restrictions).
+# Heavier containers can never be on top of lighter ones, not even at the start
+def weight_problems(data : dict) -> List[str]:
+    if "weights" not in data:
+        return []
+    labels = {label for label, _, _ in data["containers"]} | {label for shipment in data["shipments"] for label in shipment.get("in", [])}
+    problems = [f"weight given for '{label}', which is never in the yard" for label in data["weights"] if label not in labels]
+    weights = {label : data["weights"].get(label, 0) for label in labels}
+
+    slots = {(s, h) : label for label, s, h in data["containers"]}
+    for (s, h), label in slots.items():
+        below = slots.get((s, h - 1))
+        if below is not None and weights[label] > weights[below]:
+            problems.append(f"container '{label}' (weight {weights[label]}) starts on top of the lighter '{below}' (weight {weights[below]}) in stack {s}")
+    return problems
+
+# Each ship takes one action per container it brings or takes. Its window has as many actions as its duration,
+# except the last one, which has one less, as the actions are between the timesteps
+def move_problems(data : dict) -> List[str]:
+    problems = []
+    shipments = data["shipments"]
+    start = 0
+    for k, shipment in enumerate(shipments):
+        actions = shipment["duration"] - (k == len(shipments) - 1)
+        moves = len(shipment.get("in", [])) + len(shipment.get("out", []))
+        if moves > actions:
+            problems.append(f"shipment {k} (timesteps {start} to {start + shipment['duration'] - 1}) moves {moves} containers, but only has {actions} actions")
+        start += shipment["duration"]
+    return problems
+
+# By the end of each ship, the containers initially stacked on ones that have left must have been moved out of the
+# way (see EmplaceBounds.py), on top of every container brought or taken so far
+def blocking_problems(data : dict) -> List[str]:
+    problems = []
+    moves = 0
+    for bound in emplace_lower_bounds(data["containers"], data["shipments"]):
+        shipment = data["shipments"][bound["shipment"]]
+        moves += len(shipment["in"]) + len(shipment["out"])
+        if moves + bound["emplaces"] > bound["end"]:
+            problems.append(f"by the end of shipment {bound['shipment']}, {bound['emplaces']} containers must have been moved off ones leaving under them, besides {moves} containers brought or taken, but there are only {bound['end']} actions")
+    return problems
+
+# The yard must hold every container in it after each shipment. Within a ship, removing first never needs more room
+def capacity_problems(data : dict) -> List[str]:
+    stacks, tiers = data["dimensions"]
+    problems = []
+    count = len(data["containers"])
+    if count > stacks * tiers:
+        problems.append(f"{count} containers start in the yard, but it only has {stacks}x{tiers} = {stacks * tiers} slots")
+
+    start = 0
+    for k, shipment in enumerate(data["shipments"]):
+        start += shipment["duration"]
+        count += len(shipment.get("in", [])) - len(shipment.get("out", []))
+        if count > stacks * tiers:
+            problems.append(f"{count} containers are in the yard after shipment {k} (timestep {start - 1}), but it only has {stacks}x{tiers} = {stacks * tiers} slots")
+    return problems
+
+# Every problem found in the input, as readable reasons. Empty if all the checks pass
+def input_problems(data) -> List[str]:
+    problems = structure_problems(data)
+    if problems:
+        return problems # The other checks would trip over the same malformed input
+
+    problems = yard_problems(data) + label_problems(data) + weight_problems(data)
+    if problems:
+        return problems # Miscounted containers would make the counts below misleading
+    return move_problems(data) + blocking_problems(data) + capacity_problems(data)
+
+def check_input(data):
+    problems = input_problems(data)
+    if problems:
+        raise Exception("Infeasible input: " + "; ".join(problems))
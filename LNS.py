@@ -0,0 +1,133 @@
+import queue
+import random
+from multiprocessing import Pool
+from timeit import default_timer as timer
+from typing import Callable, List, Union
+
+import numpy
+
+from Plan import Plan
+
+NEIGHBOURHOODS = ['time', 'stacks', 'containers']
+
+# Neighbourhoods start as this fraction of the timeline, stacks or containers. They grow when their re-solve is
+# optimal (nothing better was left in them) and shrink when it runs out of time
+INITIAL_SIZE = 0.2
+GROWTH = 1.25
+
+# Picks the members of a neighbourhood of the given kind: a (start, stop) time window, or some stacks or containers
+def choose_neighbourhood(kind : str, size : float, plan : Plan, rng : random.Random):
+    if kind == 'time':
+        length = min(plan.t - 1, max(2, round(size * (plan.t - 1))))
+        start = rng.randrange(plan.t - length)
+        return (start, start + length)
+    if kind == 'stacks':
+        return sorted(rng.sample(range(plan.s), min(plan.s, max(2, round(size * plan.s)))))
+    return sorted(rng.sample(range(plan.c), min(plan.c, max(2, round(size * plan.c)))))
+
+# The (T, C, S, H) cells and (T - 1, S) stacks at each action that are re-solved, as masks for ContainerMatrix.fix.
+# A time window keeps its first and last states, so it still joins the rest of the plan
+def neighbourhood_masks(kind : str, members, t : int, c : int, s : int, h : int):
+    cells = numpy.zeros((t, c, s, h), dtype=bool)
+    steps = numpy.zeros((t - 1, s), dtype=bool)
+    if kind == 'time':
+        start, stop = members
+        cells[start + 1 : stop] = True
+        steps[start : stop] = True
+    elif kind == 'stacks':
+        cells[:, :, members] = True
+        steps[:, members] = True
+    else:
+        cells[:, members] = True
+        steps[:] = True
+    return cells, steps
+
+# Each worker process builds the model once, and re-solves every neighbourhood it's given on it
+worker = {}
+
+def start_worker(build : Callable, args : object):
+    compiled = build(args)
+    worker["model"] = compiled["model"]
+    worker["matrix"] = compiled["matrix"]
+
+def solve_neighbourhood(task : dict) -> dict:
+    model, matrix = worker["model"], worker["matrix"]
+    plan = task["plan"]
+
+    cells, steps = neighbourhood_masks(task["kind"], task["members"], matrix.t, matrix.c, matrix.s, matrix.h)
+    model.ClearHints()
+    matrix.hint(model, plan)
+    matrix.fix(model, plan, cells, steps)
+    solution = model.Solve(task["time"], task["execfile"], seed=task["seed"], workers=task["threads"])
+    model.Unfix()
+
+    found = solution["status"] == model.OPTIMAL or solution["status"] == model.FEASIBLE
+    return {
+        "kind": task["kind"],
+        "optimal": solution["status"] == model.OPTIMAL,
+        # The objective is integral, but reported as a float
+        "objective": round(solution["objective"]) if found else None,
+        "plan": matrix.plan(model) if found else None
+    }
+
+# Large neighbourhood search around the model. Starting from a feasible plan and its objective, the processes keep
+# re-solving neighbourhoods of the best plan found so far, each with everything outside of it fixed. The model is built
+# by build(args) in every process, and each re-solve gets neighbourhood_time seconds and threads search workers.
+# Re-solves that end with no solution at all, not even the plan they were hinted with, didn't have the time to load the
+# model, so the time limit is doubled after them. on_improvement is called with each better plan, its objective and the
+# neighbourhood that found it.
+# Returns the best plan, its objective, and the number of neighbourhoods solved
+def lns_search(build : Callable, args : object, plan : Plan, objective : float, kinds : List[str], max_time : float, neighbourhood_time : float,
+        processes : int, threads : int, seed : int = None, on_improvement : Union[Callable, None] = None) -> dict:
+    start = timer()
+    rng = random.Random(seed)
+    sizes = {kind : INITIAL_SIZE for kind in kinds}
+    limit = {"time": neighbourhood_time}
+    best = {"plan": plan, "objective": objective, "neighbourhoods": 0}
+    results = queue.Queue()
+
+    with Pool(processes, initializer=start_worker, initargs=(build, args)) as pool:
+        def submit():
+            kind = rng.choice(kinds)
+            task = {
+                "kind": kind,
+                "members": choose_neighbourhood(kind, sizes[kind], best["plan"], rng),
+                "plan": best["plan"],
+                "time": max(0.0, min(limit["time"], max_time - (timer() - start))),
+                "execfile": args.execfile,
+                "seed": rng.randrange(2 ** 31),
+                "threads": threads
+            }
+            pool.apply_async(solve_neighbourhood, (task,), callback=results.put, error_callback=results.put)
+
+        for _ in range(processes):
+            submit()
+
+        while True:
+            try:
+                result = results.get(timeout=max(0.0, max_time - (timer() - start)))
+            except queue.Empty:
+                break # Out of time, the neighbourhoods still being solved are dropped
+            if isinstance(result, BaseException):
+                raise result
+
+            best["neighbourhoods"] += 1
+            kind = result["kind"]
+            if result["objective"] is None:
+                limit["time"] *= 2
+            elif result["optimal"]:
+                sizes[kind] = min(1.0, sizes[kind] * GROWTH)
+            else:
+                sizes[kind] /= GROWTH
+
+            if result["objective"] is not None and result["objective"] > best["objective"]:
+                best["plan"], best["objective"] = result["plan"], result["objective"]
+                if on_improvement is not None:
+                    on_improvement({"objective": result["objective"], "time": timer() - start, "neighbourhood": kind}, result["plan"])
+
+            if timer() - start >= max_time:
+                break
+            submit()
+
+    best["time"] = timer() - start
+    return best
@@ -1,89 +1,231 @@
-import os
+import importlib
+import queue
+import threading
 
-from ortools.sat.python.cp_model import CpModel, CpSolver, OPTIMAL, FEASIBLE
-from docplex.cp.model import CpoModel
-from docplex.cp.solution import SOLVE_STATUS_OPTIMAL, SOLVE_STATUS_FEASIBLE
+import numpy
+
+ENCODINGS = ('integer', 'boolean')
+
+# Solver backends by name, as (module, class) pairs. A backend's module is only imported once a model for it is created:
+# importing the solver libraries is most of the startup time of small runs, and a run only ever uses one of them (or
+# none, with the greedy heuristic)
+BACKENDS = {
+    'ortools': ('OrToolsBackend', 'OrToolsBackend'),
+    'cplex': ('CplexBackend', 'CplexBackend'),
+}
+
+# Makes a Backend subclass (or a (module, class) pair, imported on use) available as a solver
+def register_backend(name : str, backend):
+    BACKENDS[name] = backend
+
+def load_backend(solver : str):
+    if solver not in BACKENDS:
+        raise Exception("Solver not supported")
+    if isinstance(BACKENDS[solver], tuple):
+        module, name = BACKENDS[solver]
+        BACKENDS[solver] = getattr(importlib.import_module(module), name)
+    return BACKENDS[solver]
 
 class Model:
-    def __init__(self, solver : str) -> None:
-        if solver == 'ortools':
-            self.ortools = CpModel()
-            self.cplex = False
-        elif solver == 'cplex':
-            self.cplex = CpoModel()
-            self.ortools = False
-        else:
-            raise Exception("Solver not supported")
+    def __init__(self, solver : str, encoding : str = 'integer') -> None:
+        if encoding not in ENCODINGS:
+            raise Exception("Encoding not supported")
+        # In 'boolean' encoding, binary cells are native booleans and can be used directly as enforcement literals
+        self.boolean = encoding == 'boolean'
+
+        self.literals = {}
+        self.literal_hits = 0
+        self.literal_misses = 0
+
+        # Everything handed to the backend, for build profiling. Folded constraints and replayed variables don't count
+        self.variables_created = 0
+        self.constraints_added = 0
+
+        # Set by Load: while replaying, NewIntVar/NewBoolVar hand out the loaded model's variables instead of creating new ones
+        self.replay = None
+
+        # The backend is picked once here, so the methods below never branch on the solver
+        self.backend = load_backend(solver)()
+        self.OPTIMAL = self.backend.OPTIMAL
+        self.FEASIBLE = self.backend.FEASIBLE
+        self.EXTENSION = self.backend.EXTENSION
 
     # Model methods
+    # Cells that presolve proved to be 0 are plain ints instead of variables, so constant (bool) expressions and
+    # literals are folded away here: trivially true constraints and never enforced ones aren't added at all
     def Not(self, b):
-        if self.ortools:
-            return b.Not()
-        elif self.cplex:
-            return 1 - b
+        if isinstance(b, bool):
+            return not b
+        return self.backend.Not(b)
 
     def NewIntVar(self, min, max, identifier):
-        if self.ortools:
-            return self.ortools.NewIntVar(min, max, identifier)
-        elif self.cplex:
-            return self.cplex.integer_var(min, max, identifier)
+        if self.replay is not None:
+            return self.replay(identifier, False)
+        self.variables_created += 1
+        return self.backend.NewIntVar(min, max, identifier)
 
     def NewBoolVar(self, i):
-        if self.ortools:
-            return self.ortools.NewBoolVar(i)
-        elif self.cplex:
-            return self.cplex.binary_var(i)
+        if self.replay is not None:
+            return self.replay(i, True)
+        self.variables_created += 1
+        return self.backend.NewBoolVar(i)
+
+    def NewBinaryVar(self, identifier):
+        if self.boolean:
+            return self.NewBoolVar(identifier)
+        else:
+            return self.NewIntVar(0, 1, identifier)
+
+    def literal_for(self, var, value = 1):
+        # Returns a literal that holds iff var == value. Each (var, value) pair is only reified once per model
+        if isinstance(var, int):
+            return var == value
+
+        key = (id(var), value)
+        if key in self.literals:
+            self.literal_hits += 1
+            return self.literals[key][1]
+        self.literal_misses += 1
+
+        # Only binary variables are their own literals, others (like positions) are reified below
+        if self.boolean and value in (0, 1) and self.backend.IsBoolean(var):
+            literal = var if value == 1 else self.Not(var)
+        else:
+            literal = self.NewBoolVar('b')
+            self.AddIf(var == value, literal)
+            self.AddIf(var != value, self.Not(literal))
+
+        # The variable is kept alongside its literal, so that its id() can't be reused while cached
+        self.literals[key] = (var, literal)
+        return literal
         
     def Add(self, expr):
-        if self.ortools:
-            return self.ortools.Add(expr)
-        elif self.cplex:
-            return self.cplex.add(expr)
+        if isinstance(expr, bool):
+            if expr:
+                return None
+            # Only reachable with contradicting input, which must still make the model infeasible
+            expr = self.NewIntVar(0, 0, 'false') == 1
+        self.constraints_added += 1
+        return self.backend.Add(expr)
 
     def AddIf(self, expr, *b):
-        if self.ortools:
-            return self.ortools.Add(expr).OnlyEnforceIf(b)
-        elif self.cplex:
-            
-            return self.cplex.add(self.cplex.if_then(sum(b) == len(b), expr))
+        if any(l is False for l in b) or expr is True:
+            return None
+        b = [l for l in b if l is not True]
+        if not b:
+            return self.Add(expr)
+        if expr is False:
+            return self.Add(sum(b) <= len(b) - 1)
+
+        self.constraints_added += 1
+        return self.backend.AddIf(expr, b)
+
+    # expressions[index] == target, where the expressions can be constants. A constant index selects one of them
+    def AddElement(self, index, expressions, target):
+        if isinstance(index, int):
+            return self.Add(expressions[index] == target)
+        self.constraints_added += 1
+        return self.backend.AddElement(index, expressions, target)
+
+    def AddAllDifferent(self, expressions):
+        self.constraints_added += 1
+        return self.backend.AddAllDifferent(expressions)
+
+    def AddHint(self, var, value):
+        if isinstance(var, int):
+            return None
+        return self.backend.AddHint(var, value)
+
+    def ClearHints(self):
+        return self.backend.ClearHints()
+
+    # Fixes the variables (or constants) to the values until Unfix. Both are arrays of the same shape
+    def Fix(self, variables, values):
+        flat = numpy.asarray(variables, dtype=object).ravel().tolist()
+        values = numpy.asarray(values).ravel().tolist()
+        pairs = [(v, int(value)) for v, value in zip(flat, values) if not isinstance(v, int)]
+        return self.backend.Fix([v for v, _ in pairs], [value for _, value in pairs])
+
+    def Unfix(self):
+        return self.backend.Unfix()
+
+    # Serialization methods
+    def Save(self, path):
+        return self.backend.Save(path)
+
+    def Load(self, path):
+        # Replaces the model with one written by Save. Variables declared afterwards (in the same order and with the same
+        # identifiers as when the model was built) are looked up in the loaded model, instead of being created
+        self.replay = self.backend.Load(path)
+
+    def StopReplay(self):
+        self.replay = None
 
     # Solver methods
     def Maximize(self, expr):
-        if self.ortools:
-            return self.ortools.Maximize(expr)
-        elif self.cplex:
-            return self.cplex.add(self.cplex.maximize(expr))
+        return self.backend.Maximize(expr)
 
     def Value(self, expr):
-        if self.ortools:
-            return self.solver.Value(expr)
-        elif self.cplex:
-            return self.solver.get_value(expr)
-
-    def Solve(self, max_time, execfile='/opt/ibm/ILOG/CPLEX_Studio201/cpoptimizer/bin/x86-64_linux/cpoptimizer'):
-        if self.ortools:
-            self.OPTIMAL = OPTIMAL
-            self.FEASIBLE = FEASIBLE
-            self.solver = CpSolver()
-            
-            if max_time is not None:
-                self.solver.parameters.max_time_in_seconds = max_time
-            
-            status = self.solver.Solve(self.ortools)
-            return {
-                "status": status,
-                "time": self.solver.WallTime(),
-                "objective": self.solver.ObjectiveValue()
-            }
-        elif self.cplex:
-            self.OPTIMAL = SOLVE_STATUS_OPTIMAL
-            self.FEASIBLE = SOLVE_STATUS_FEASIBLE
-        
-            self.solver = self.cplex.solve(execfile=execfile,
-             TimeLimit=max_time,
-             log_output=open(os.devnull,"w"))
-            return {
-                "status": self.solver.get_solve_status(),
-                "time": self.solver.get_solve_time(),
-                "objective": sum(self.solver.get_objective_values()) if self.solver.get_objective_values() else None
-            }
+        if isinstance(expr, int):
+            return expr
+        return self.backend.Value(expr)
+
+    # Bulk version of Value: reads the values of an array of variables (or constants) from the whole solution at once
+    def Values(self, variables) -> numpy.ndarray:
+        variables = numpy.asarray(variables, dtype=object)
+        flat = variables.ravel().tolist()
+
+        values = numpy.array([v if isinstance(v, int) else 0 for v in flat], dtype=numpy.int64)
+        indices = [i for i, v in enumerate(flat) if not isinstance(v, int)]
+        if indices:
+            values[indices] = self.backend.Values([flat[i] for i in indices])
+        return values.reshape(variables.shape)
+
+    # lns is one of None (solver default), 'off' or 'only'. portfolio is a list of CP-SAT subsolver names.
+    # parameters are passed as-is to the solver (SatParameters fields for ortools, CpoParameters for cplex).
+    # on_solution is called with the solution number, objective, bound and wall time of each improving solution, and
+    # can read that solution through Value. Returning True from it stops the search
+    def Solve(self, max_time, execfile='/opt/ibm/ILOG/CPLEX_Studio201/cpoptimizer/bin/x86-64_linux/cpoptimizer', seed=None, workers=None, lns=None, portfolio=None, parameters=None, on_solution=None):
+        assert lns in (None, 'off', 'only')
+        parameters = dict(parameters) if parameters else {}
+        return self.backend.Solve(max_time, execfile, seed, workers, lns, portfolio, parameters, on_solution)
+
+    # Generator version of Solve's on_solution: yields each improving solution while the search is paused, so Value
+    # reads the yielded solution. Closing the generator stops the search. The final result is stored in self.result
+    def Solutions(self, *args, **kwargs):
+        solutions = queue.Queue()
+        resume = threading.Event()
+        stop = threading.Event()
+        finished = object()
+
+        def on_solution(solution):
+            if stop.is_set():
+                return True
+            solutions.put(solution)
+            resume.wait()
+            resume.clear()
+            return stop.is_set()
+
+        def search():
+            try:
+                self.result = self.Solve(*args, on_solution=on_solution, **kwargs)
+                solutions.put(finished)
+            except Exception as e:
+                solutions.put(e)
+
+        thread = threading.Thread(target=search, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                solution = solutions.get()
+                if solution is finished:
+                    break
+                if isinstance(solution, Exception):
+                    raise solution
+                yield solution
+                resume.set()
+        finally:
+            stop.set()
+            resume.set()
+            thread.join()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Union
+
+from Model import Model
+
+# Bump when the layout of the cached files changes
+CACHE_VERSION = 1
+
+# The compiled model depends on the code that builds it, so editing any of these invalidates the cache
+MODEL_SOURCES = ("main.py", "EmplaceBounds.py", "Constraints.py", "ContainerMatrix.py", "PositionConstraints.py", "PositionMatrix.py", "Model.py", "OrToolsBackend.py", "CplexBackend.py")
+
+# Least recently used cache of compiled models, holding at most max_size megabytes in directory
+class ModelCache:
+    def __init__(self, directory : str, max_size : float) -> None:
+        self.directory = directory
+        self.max_size = max_size * 1024 * 1024
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data : dict, solver : str, options : dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION} {solver} {json.dumps(options, sort_keys=True)}".encode())
+        digest.update(json.dumps(data, sort_keys=True).encode())
+
+        source_directory = os.path.dirname(os.path.abspath(__file__))
+        for source in MODEL_SOURCES:
+            with open(os.path.join(source_directory, source), "rb") as f:
+                digest.update(f.read())
+
+        return digest.hexdigest()
+
+    # The model file is in the format of the model's backend
+    def paths(self, key : str, model : Model):
+        base = os.path.join(self.directory, key)
+        return base + model.EXTENSION, base + ".json"
+
+    # Loads the cached model into model, returning its metadata. Returns None on a cache miss
+    def load(self, key : str, model : Model) -> Union[dict, None]:
+        model_path, metadata_path = self.paths(key, model)
+        if not (os.path.exists(model_path) and os.path.exists(metadata_path)):
+            return None
+
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            model.Load(model_path)
+        except FileNotFoundError:
+            return None # Evicted by a concurrent run since
+
+        # Touching the files marks them as recently used
+        try:
+            os.utime(model_path)
+            os.utime(metadata_path)
+        except FileNotFoundError:
+            pass
+
+        return metadata
+
+    def store(self, key : str, model : Model, metadata : dict):
+        model_path, metadata_path = self.paths(key, model)
+
+        # Written under temporary names first, so that a concurrent run never loads half a model. The names are unique,
+        # as runs sharing the directory may store the same key at the same time. evict skips them, as they contain '.tmp'
+        descriptor, temporary_model_path = tempfile.mkstemp(suffix=model.EXTENSION, prefix=key + ".tmp", dir=self.directory)
+        os.close(descriptor)
+        model.Save(temporary_model_path)
+        descriptor, temporary_metadata_path = tempfile.mkstemp(suffix=".json", prefix=key + ".tmp", dir=self.directory)
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(metadata, f)
+
+        os.replace(temporary_model_path, model_path)
+        os.replace(temporary_metadata_path, metadata_path)
+
+        self.evict()
+
+    def evict(self):
+        # Each entry is a model file plus its metadata, sharing the key as file name
+        entries = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if ".tmp" in name or not os.path.isfile(path):
+                continue
+            try:
+                status = os.stat(path)
+            except FileNotFoundError:
+                continue # Evicted by a concurrent run
+            last_used, size, paths = entries.get(name.split(".")[0], (0, 0, []))
+            entries[name.split(".")[0]] = (max(last_used, status.st_mtime), size + status.st_size, paths + [path])
+
+        total_size = sum(size for _, size, _ in entries.values())
+        for _, size, paths in sorted(entries.values()):
+            if total_size <= self.max_size:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass # Already evicted by a concurrent run
+            total_size -= size
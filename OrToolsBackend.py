@@ -0,0 +1,130 @@
+from ortools.sat.python import cp_model
+
+from Backend import Backend
+
+class SolutionCallback(cp_model.CpSolverSolutionCallback):
+    def __init__(self, backend, on_solution) -> None:
+        super().__init__()
+        self.backend = backend
+        self.on_solution = on_solution
+        self.solutions = 0
+
+    def on_solution_callback(self):
+        self.solutions += 1
+        # While on_solution runs, Value reads this intermediate solution
+        self.backend.values = self
+        stop = self.on_solution({
+            "solution": self.solutions,
+            "objective": self.ObjectiveValue(),
+            "bound": self.BestObjectiveBound(),
+            "time": self.WallTime()
+        })
+        if stop:
+            self.StopSearch()
+
+class OrToolsBackend(Backend):
+    OPTIMAL = cp_model.OPTIMAL
+    FEASIBLE = cp_model.FEASIBLE
+    EXTENSION = '.txt'
+
+    def __init__(self) -> None:
+        self.bind(cp_model.CpModel())
+        self.fixed = []
+
+    # The calls made for every cell go straight to CP-SAT's own methods
+    def bind(self, model):
+        self.model = model
+        self.NewIntVar = model.NewIntVar
+        self.NewBoolVar = model.NewBoolVar
+        self.Add = model.Add
+        self.AddElement = model.AddElement
+        self.AddAllDifferent = model.AddAllDifferent
+        self.AddHint = model.AddHint
+        self.ClearHints = model.ClearHints
+        self.Maximize = model.Maximize
+
+    def Not(self, b):
+        return b.Not()
+
+    def IsBoolean(self, var) -> bool:
+        return var.is_boolean
+
+    def AddIf(self, expr, literals : list):
+        return self.model.Add(expr).OnlyEnforceIf(literals)
+
+    # Variables are fixed by narrowing their domains in the proto, which Unfix restores
+    def Fix(self, variables : list, values : list):
+        proto = self.model.Proto()
+        for v, value in zip(variables, values):
+            domain = proto.variables[v.Index()].domain
+            self.fixed.append((v.Index(), list(domain)))
+            domain.clear()
+            domain.extend([value, value])
+
+    def Unfix(self):
+        proto = self.model.Proto()
+        # In reverse, so a variable fixed twice gets its original domain back
+        for index, original in reversed(self.fixed):
+            domain = proto.variables[index].domain
+            domain.clear()
+            domain.extend(original)
+        self.fixed = []
+
+    def Save(self, path : str):
+        # ortools only writes the text format when the file name ends with 'txt'
+        assert path.endswith('txt')
+        return self.model.ExportToFile(path)
+
+    def Load(self, path : str):
+        model = cp_model.CpModel()
+        with open(path) as f:
+            if not model.Proto().parse_text_format(f.read()):
+                raise Exception("Invalid model file")
+        self.bind(model)
+
+        next_index = iter(range(len(model.Proto().variables)))
+        def replay(identifier, boolean):
+            index = next(next_index)
+            return model.GetBoolVarFromProtoIndex(index) if boolean else model.GetIntVarFromProtoIndex(index)
+        return replay
+
+    def Value(self, expr) -> int:
+        return self.values.Value(expr)
+
+    def Values(self, variables : list) -> list:
+        solution = self.values.response_proto.solution
+        return [solution[v.Index()] for v in variables]
+
+    def Solve(self, max_time, execfile, seed, workers, lns, portfolio, parameters : dict, on_solution) -> dict:
+        self.solver = cp_model.CpSolver()
+
+        if max_time is not None:
+            self.solver.parameters.max_time_in_seconds = max_time
+        if seed is not None:
+            self.solver.parameters.random_seed = seed
+        if workers is not None:
+            self.solver.parameters.num_workers = workers
+        if lns == 'off':
+            self.solver.parameters.use_lns = False
+        elif lns == 'only':
+            self.solver.parameters.use_lns_only = True
+        if portfolio:
+            self.solver.parameters.subsolvers.extend(portfolio)
+
+        for name, value in parameters.items():
+            if isinstance(value, list):
+                getattr(self.solver.parameters, name).extend(value)
+            else:
+                setattr(self.solver.parameters, name, value)
+
+        callback = SolutionCallback(self, on_solution) if on_solution is not None else None
+        status = self.solver.Solve(self.model, callback)
+        self.values = self.solver
+        if status == cp_model.MODEL_INVALID:
+            # Also reported for bad parameters, e.g. an unknown subsolver in the portfolio
+            raise Exception(f"Invalid model or solver parameters: {self.solver.SolutionInfo()}")
+        return {
+            "status": status,
+            "time": self.solver.WallTime(),
+            "objective": self.solver.ObjectiveValue()
+        }
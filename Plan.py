@@ -0,0 +1,253 @@
+import string
+from typing import List, Union
+
+import numpy
+
+# Action codes, in the order used by the action vector
+IDLE, EMPLACE, REMOVE, INSERT = range(4)
+ACTION_NAMES = ("Id", "Em", "Re", "In")
+ACTION_LONG_NAMES = ("Idle", "Emplace", "Remove", "Insert")
+
+COLORS = [
+    (230, 25, 75), 
+    (60, 180, 75), 
+    (255, 225, 25), 
+    (0, 130, 200), 
+    (245, 130, 48), 
+    (145, 30, 180), 
+    (70, 240, 240),
+    (240, 50, 230), 
+    (210, 245, 60), 
+    (250, 190, 212), 
+    (0, 128, 128),
+    (220, 190, 255), 
+    (170, 110, 40), 
+    (255, 250, 200), 
+    (128, 0, 0), 
+    (170, 255, 195), 
+    (128, 128, 0), 
+    (255, 215, 180), 
+    (0, 0, 128), 
+    (128, 128, 128), 
+    (255, 255, 255), 
+    (0, 0, 0),
+]
+
+EMPTY = -1
+
+class Plan:
+    # grid[t, s, h] is the index of the container in that place at time t, or EMPTY.
+    # actions[t] is the action taken between t and t + 1, and moves[t] its (out stack, out height, in stack, in height), EMPTY where unused
+    def __init__(self, grid : numpy.ndarray, actions : numpy.ndarray, moves : numpy.ndarray, c : int) -> None:
+        self.grid = grid
+        self.actions = actions
+        self.moves = moves
+        self.t, self.s, self.h = grid.shape
+        self.c = c
+
+    # Part of the plan from state start up to (not including) state stop, with the actions between them
+    def between(self, start : int, stop : int = None) -> "Plan":
+        stop = self.t if stop is None else stop
+        return Plan(self.grid[start:stop], self.actions[start:stop - 1], self.moves[start:stop - 1], self.c)
+
+    # Renumbers the containers, mapping[i] being the new index of container i (or EMPTY to drop it)
+    def relabel(self, mapping : numpy.ndarray, c : int) -> "Plan":
+        mapping = numpy.append(numpy.asarray(mapping, dtype=numpy.int16), numpy.int16(EMPTY)) # So that EMPTY maps to itself
+        return Plan(mapping[self.grid], self.actions, self.moves, c)
+
+    def occupancy(self) -> numpy.ndarray:
+        # One-hot (T, C, S, H) view of the grid, matching the ContainerMatrix variables
+        return self.grid[:, None, :, :] == numpy.arange(self.c)[None, :, None, None]
+
+    def lifetimes(self) -> numpy.ndarray:
+        return self.occupancy().any(axis=(2, 3))
+
+    def decision_grid(self) -> numpy.ndarray:
+        # (T - 1, 2, S, H) view of the moves, matching the ContainerMatrix decision variables ('in' first, then 'out')
+        decisions = numpy.zeros((self.t - 1, 2, self.s, self.h), dtype=bool)
+        for time, (out_s, out_h, in_s, in_h) in enumerate(self.moves):
+            if in_s != EMPTY:
+                decisions[time, 0, in_s, in_h] = True
+            if out_s != EMPTY:
+                decisions[time, 1, out_s, out_h] = True
+        return decisions
+
+    def decisions(self) -> List[str]:
+        return [ACTION_NAMES[action] for action in self.actions]
+
+    def print_guidance(self):
+        print("""
+            -----time---->
+           |     
+           |     
+        container
+           |     
+           V             """)
+
+    def print_binary_grid(self, labels : List[str]):
+        occupancy = self.occupancy()
+        for container in range(self.c):
+            print()
+            for height in reversed(range(self.h)):
+                for time in range(self.t):
+                    for stack in range(self.s):
+                        print(f"{int(occupancy[time, container, stack, height])} ", end="")
+                    print("| ", end="")
+                print(labels[container])
+
+    def print_condensed_grid(self, labels : List[str]):
+        for height in reversed(range(self.h)):
+            for time in range(self.t):
+                for stack in range(self.s):
+                    container = self.grid[time, stack, height]
+                    print(". " if container == EMPTY else labels[container] + " ", end="")
+                print("| ", end="")
+            print()
+
+    def print_decisions(self):
+        decisions = self.decision_grid()
+        for m, movement in enumerate(("in", "out")):
+            print()
+            for height in reversed(range(self.h)):
+                for time in range(self.t - 1):
+                    for stack in range(self.s):
+                        print(f"{int(decisions[time, m, stack, height])} ", end="")
+                    print("| ", end="")
+                print(" " + movement)
+
+    def print_condensed_decisions(self):
+        decisions = self.decision_grid()
+        for height in reversed(range(self.h)):
+            for time in range(self.t - 1):
+                for stack in range(self.s):
+                    if decisions[time, 0, stack, height]:
+                        print("I ", end="")
+                    elif decisions[time, 1, stack, height]:
+                        print("O ", end="")
+                    else:
+                        print(". ", end="")
+                print("| ", end="")
+            print()
+
+    def print_lifetimes(self, labels : List[str]):
+        print("LIFETIMES:")
+        for i, lifetime in enumerate(self.lifetimes().T):
+            print(f"{labels[i]}: {[int(e) for e in lifetime]}")
+
+    def print_solution(self, labels : Union[List[str], str] = None, detail : bool = False):
+        if labels == None:
+            labels = list(string.ascii_uppercase)[:self.c]
+
+        if detail:
+            self.print_binary_grid(labels)
+
+        spacer = (((self.s + 1) * 2) * self.t - 1)
+        print("=" * spacer)
+        self.print_condensed_grid(labels)
+        print("=" * spacer)
+
+        self.print_lifetimes(labels)
+
+        print("DECISION VARIABLES")
+        print("Decisions: ", end="")
+        print("[" + ", ".join(self.decisions()) + "]")
+
+        if detail:
+            self.print_decisions()
+        decision_spacer = (((self.s + 1) * 2) * (self.t - 1) - 1)
+        print("=" * decision_spacer)
+        self.print_condensed_decisions()
+        print("=" * decision_spacer)
+
+    def visualize(self, shipments : List[dict], labels : Union[List[str], str] = None):
+        import pygame
+        
+        if labels == None:
+            labels = list(string.ascii_uppercase)[:self.c]
+        pygame.init()
+        win = pygame.display.set_mode((self.s * 36 + 300, self.h * 36 + 100))
+        pygame.display.set_caption("Container animation")
+
+        font = pygame.font.SysFont(None, 50)
+
+        state = 0
+        state_already_changed = False
+
+        run = True
+        while run:
+            pygame.time.delay(10)
+            
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    run = False
+
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_LEFT]:
+                if not state_already_changed:
+                    state -= 1
+                    state_already_changed = True
+            elif keys[pygame.K_RIGHT]:
+                if not state_already_changed:
+                    state += 1
+                    state_already_changed = True
+            else:
+                state_already_changed = False
+                    
+            state = max(0, min(state, len(self.actions)))
+
+
+            win.fill((255, 255, 255))
+
+            img = font.render(f"t={state}", True, (0, 0, 0))
+            win.blit(img, (self.s * 36 + 220, 20))
+
+            next_instruction = ACTION_LONG_NAMES[self.actions[state]] if state < self.t - 1 else "Done"
+
+            img = pygame.font.SysFont(None, 25).render(f"Next instruction: {next_instruction}", True, (0, 0, 0))
+            win.blit(img, (20, 20))
+
+            counter = 0
+            message = None
+
+            for shipment in shipments:
+                next_counter = counter + shipment["duration"]
+
+                if counter <= state < next_counter:
+                    if "in" in shipment:
+                        message = f"Shipment d={shipment['duration']} in={shipment['in']} out={shipment['out']}"
+                    else:
+                        message = f"Gap d={shipment['duration']}"
+                    break    
+                counter = next_counter
+
+            img = pygame.font.SysFont(None, 25).render(message, True, (0, 0, 0))
+            win.blit(img, (20, 40))
+
+            X = 36 * self.s / 2 + 100
+            Y = 36 * self.h + 50
+
+            for height in reversed(range(self.h)):
+                for stack in range(self.s):
+                    container = self.grid[state, stack, height]
+                    if container != EMPTY:
+                        background_color = COLORS[container % len(COLORS)]
+                        foreground_color = (0, 0, 0) if sum(background_color) / 3 >= 256 / 2 else (255, 255, 255)
+
+                        name = labels[container]
+                        img = font.render(name, True, foreground_color)
+                        pygame.draw.rect(win, background_color, (X + stack * 36 + 1, Y - height * 36 + 1, 35, 35))
+                        win.blit(img, (X + stack * 36 + 2, Y - height * 36 + 4))
+                    else:
+                        pygame.draw.rect(win, (240, 240, 240), (X + stack * 36 + 1, Y - height * 36 + 1, 35, 35))
+
+            pygame.display.update()
+
+        pygame.quit()
+
+# Joins plans laid out back to back on one timeline. Each plan after the first starts from the final state of
+# the one before it, so that shared state is only kept once. All plans must use the same container indices
+def concatenate(plans : List[Plan]) -> Plan:
+    grid = numpy.concatenate([plans[0].grid] + [plan.grid[1:] for plan in plans[1:]])
+    actions = numpy.concatenate([plan.actions for plan in plans])
+    moves = numpy.concatenate([plan.moves for plan in plans])
+    return Plan(grid, actions, moves, max(plan.c for plan in plans))
@@ -0,0 +1,85 @@
+import json
+import struct
+from typing import Iterator, List, Tuple
+
+import numpy
+
+from Plan import Plan, ACTION_LONG_NAMES, IDLE, INSERT, EMPTY
+
+# Binary plan files start with the magic, the format version and the length of the JSON header after them.
+# The header holds the labels, the shipments and where each array is stored. Arrays are stored raw, little
+# endian and aligned, so readers can memory map them without copying or parsing anything
+MAGIC = b"CSPPLAN\0"
+VERSION = 1
+PREFIX = struct.Struct("<8sII")
+ALIGNMENT = 64
+
+def aligned(offset : int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def save_plan(path : str, plan : Plan, labels : List[str], shipments : List[dict]):
+    arrays = {
+        "grid": numpy.ascontiguousarray(plan.grid, dtype="<i2"),
+        "actions": numpy.ascontiguousarray(plan.actions, dtype="<i1"),
+        "moves": numpy.ascontiguousarray(plan.moves, dtype="<i2")
+    }
+
+    # Offsets depend on the header length, which depends on the offsets, so they're relative to the data start
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = aligned(offset + array.nbytes)
+
+    header = json.dumps({"labels": list(labels), "shipments": shipments, "arrays": layout}).encode()
+    data_start = aligned(PREFIX.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        # Seeking alone doesn't extend the file, so empty arrays at the end (a plan with no moves) would lie past it
+        f.truncate(data_start + offset)
+
+# Returns the plan, its arrays being read-only memory maps of the file, and the header
+def load_plan(path : str) -> Tuple[Plan, dict]:
+    with open(path, "rb") as f:
+        magic, version, header_length = PREFIX.unpack(f.read(PREFIX.size))
+        if magic != MAGIC:
+            raise Exception(f"'{path}' is not a plan file")
+        if version != VERSION:
+            raise Exception(f"'{path}' has plan format version {version}, only {VERSION} is supported")
+        header = json.loads(f.read(header_length))
+
+    data_start = aligned(PREFIX.size + header_length)
+    arrays = {}
+    for name, array in header["arrays"].items():
+        shape = tuple(array["shape"])
+        if 0 in shape:
+            # Empty arrays have nothing to map
+            arrays[name] = numpy.empty(shape, dtype=array["dtype"])
+        else:
+            arrays[name] = numpy.memmap(path, dtype=array["dtype"], mode="r", offset=data_start + array["offset"], shape=shape)
+    return Plan(arrays["grid"], arrays["actions"], arrays["moves"], len(header["labels"])), header
+
+# Move list view of a plan: one entry per action that isn't idle, with the container moved and its places
+def moves(plan : Plan, labels : List[str]) -> Iterator[dict]:
+    for t in numpy.flatnonzero(plan.actions != IDLE).tolist():
+        action = int(plan.actions[t])
+        out_s, out_h, in_s, in_h = plan.moves[t].tolist()
+        # Inserted containers only show up in the grid after their move
+        container = plan.grid[t + 1, in_s, in_h] if action == INSERT else plan.grid[t, out_s, out_h]
+        yield {
+            "t": t,
+            "action": ACTION_LONG_NAMES[action],
+            "container": labels[container],
+            "from": None if out_s == EMPTY else [out_s, out_h],
+            "to": None if in_s == EMPTY else [in_s, in_h]
+        }
+
+def save_moves(path : str, plan : Plan, labels : List[str]):
+    with open(path, "w") as f:
+        for move in moves(plan, labels):
+            f.write(json.dumps(move) + "\n")
@@ -0,0 +1,82 @@
+import Constraints as Constraints
+from Model import Model
+from PositionMatrix import PositionMatrix
+
+# Constraints of the position formulation, the counterpart of Constraints.py for PositionMatrix
+
+# A container is in the yard exactly when its slot is in the yard, and otherwise it's in its own place outside of it
+def p1(model : Model, matrix : PositionMatrix):
+    for t in range(matrix.t):
+        for c in range(matrix.c):
+            live = model.literal_for(matrix.lifetime[t][c])
+            model.AddIf(matrix.slot[t][c] < matrix.yard, live)
+            model.AddIf(matrix.slot[t][c] == matrix.outside(c), model.Not(live))
+
+# No two containers can exist in the same place, at each given t
+def p2(model : Model, matrix : PositionMatrix):
+    for t in range(matrix.t):
+        model.AddAllDifferent(matrix.slot[t])
+
+# Forbids floating containers. Every container is below the height of its stack, and the heights add up to the number
+# of containers in the yard, so each stack of height n holds exactly one container on each of its n lowest tiers
+def p3(model : Model, matrix : PositionMatrix):
+    for t in range(matrix.t):
+        # Outside of the yard, a container is alone on the ground of its own stack
+        heights = [matrix.height[t][slot // matrix.h] for slot in range(matrix.yard)] + [1] * matrix.c
+        tiers = [slot % matrix.h for slot in range(matrix.yard)] + [0] * matrix.c
+        for c in range(matrix.c):
+            model.AddElement(matrix.slot[t][c], heights, matrix.level[t][c])
+            model.AddElement(matrix.slot[t][c], tiers, matrix.tier[t][c])
+            model.Add(matrix.tier[t][c] < matrix.level[t][c])
+        model.Add(sum(matrix.height[t]) == sum(matrix.lifetime[t]))
+
+# For each time t, only one action can be chosen
+def p4(model : Model, matrix : PositionMatrix):
+    for quartet in zip(matrix.emplace, matrix.idle, matrix.remove, matrix.insert):
+        model.Add(sum(quartet) == 1)
+
+# Every action but 'idle' moves exactly one container
+def p5(model : Model, matrix : PositionMatrix):
+    for t in range(matrix.t - 1):
+        model.Add(sum(matrix.moved[t], 0) == 1 - matrix.idle[t])
+
+# The moved container changes its slot, and every other container stays where it is
+def p6(model : Model, matrix : PositionMatrix):
+    for t in range(matrix.t - 1):
+        for c in range(matrix.c):
+            moved = model.literal_for(matrix.moved[t][c])
+            model.AddIf(matrix.slot[t][c] == matrix.slot[t + 1][c], model.Not(moved))
+            model.AddIf(matrix.slot[t][c] != matrix.slot[t + 1][c], moved)
+
+# When a 'remove'  action is chosen, the number of 'live' containers is reduced   by one (1)
+# When an 'insert' action is chosen, the number of 'live' containers is increased by one (1)
+# As only the moved container changes, it's the one that leaves or arrives, and 'emplace' moves it inside the yard
+def p7(model : Model, matrix : PositionMatrix):
+    for t in range(matrix.t - 1):
+        model.Add(sum(matrix.lifetime[t]) == sum(matrix.lifetime[t + 1]) + matrix.remove[t] - matrix.insert[t])
+
+# Families taking extra input data, skipped by the main constraint loop like in Constraints.py
+
+# Each place is at least as heavy as the one above it. The weight of a place is the weight class of the container in it,
+# and is free when it's empty, as nothing can be above an empty place
+def weight_order(model : Model, matrix : PositionMatrix, class_array):
+    for t in range(matrix.t):
+        weights = [model.NewIntVar(0, max(class_array), 'w') for _ in range(matrix.yard)]
+        for c in range(matrix.c):
+            model.AddElement(matrix.slot[t][c], weights + class_array, class_array[c])
+        for slot in range(matrix.yard):
+            if slot % matrix.h > 0:
+                model.Add(weights[slot - 1] >= weights[slot])
+
+# Stacks that start empty are interchangeable: the later one of each pair can only hold a container once the earlier one has been used
+def symmetry_empty_stacks(model : Model, matrix : PositionMatrix, empty_stacks):
+    for first, second in zip(empty_stacks, empty_stacks[1:]):
+        used = 0
+        for t in range(matrix.t):
+            used_now = model.NewBoolVar('u')
+            model.Add(used_now <= used + matrix.height[t][first])
+            model.Add(matrix.height[t][second] <= matrix.h * used_now)
+            used = used_now
+
+# Only involves lifetimes, which both formulations share
+symmetry_identical_containers = Constraints.symmetry_identical_containers
@@ -0,0 +1,127 @@
+from typing import List, Union
+
+import numpy
+
+from Model import Model
+from Plan import Plan, IDLE, EMPLACE, REMOVE, INSERT, EMPTY, ACTION_NAMES
+
+class PositionMatrix:
+    # Compact alternative to ContainerMatrix: instead of a one-hot (T, C, S, H) grid, each container has a few small
+    # integers per timestep. Its slot is its place, stack * h + tier, and slot s * h + c is container c's own place
+    # outside of the yard, so that the slots of a timestep are always all different. Its tier, and the height of its
+    # stack, are looked up from the slot. Each stack also has a height per timestep, and each action moves at most one
+    # container, marked in moved
+    # live is the same optional (T, C) mask as ContainerMatrix's: outside of it, containers are constants outside the yard
+    def __init__(self, model : Model, t : int, c : int, s : int, h : int, live : numpy.ndarray = None) -> None:
+        self.model = model
+        self.t = t
+        self.c = c
+        self.s = s
+        self.h = h
+        self.yard = s * h
+        self.live = numpy.ones((t, c), dtype=bool) if live is None else live
+
+        self.lifetime = []
+        self.slot = []
+        self.tier = []
+        # Height of the container's stack, 1 when it's outside of the yard
+        self.level = []
+        for time in range(t):
+            lifetime, slot, tier, level = [], [], [], []
+            for container in range(c):
+                if self.live[time, container]:
+                    lifetime.append(model.NewBinaryVar(f"t{time}c{container}l"))
+                    slot.append(model.NewIntVar(0, self.yard + c - 1, f"t{time}c{container}p"))
+                    tier.append(model.NewIntVar(0, h - 1, f"t{time}c{container}h"))
+                    level.append(model.NewIntVar(1, h, f"t{time}c{container}n"))
+                else:
+                    lifetime.append(0)
+                    slot.append(self.outside(container))
+                    tier.append(0)
+                    level.append(1)
+            self.lifetime.append(lifetime)
+            self.slot.append(slot)
+            self.tier.append(tier)
+            self.level.append(level)
+
+        self.height = [[model.NewIntVar(0, h, f"t{time}s{stack}n") for stack in range(s)] for time in range(t)]
+
+        self.idle = []
+        self.remove = []
+        self.emplace = []
+        self.insert = []
+        self.moved = []
+        for time in range(t - 1):
+            self.idle.append(model.NewBinaryVar(f"d{time}idle"))
+            self.remove.append(model.NewBinaryVar(f"d{time}remove"))
+            self.emplace.append(model.NewBinaryVar(f"d{time}emplace"))
+            self.insert.append(model.NewBinaryVar(f"d{time}insert"))
+            self.moved.append([
+                model.NewBinaryVar(f"d{time}c{container}m") if self.live[time, container] or self.live[time + 1, container] else 0
+                for container in range(c)
+            ])
+
+    def outside(self, c : int) -> int:
+        return self.yard + c
+
+    # Literal of container c being at (s, h) at time t, the equivalent of a ContainerMatrix cell
+    def get(self, t : int, c : int, s : int, h : int):
+        slot = self.slot[t][c]
+        if isinstance(slot, int):
+            return int(slot == s * self.h + h)
+        return self.model.literal_for(slot, s * self.h + h)
+
+    def hint(self, model : Model, plan : Plan):
+        slots = numpy.array([[self.outside(c) for c in range(self.c)]] * self.t)
+        tiers = numpy.zeros((self.t, self.c), dtype=int)
+        levels = numpy.ones((self.t, self.c), dtype=int)
+        heights = (plan.grid != EMPTY).sum(axis=2)
+        for time, stack, height in numpy.argwhere(plan.grid != EMPTY):
+            container = plan.grid[time, stack, height]
+            slots[time, container] = stack * self.h + height
+            tiers[time, container] = height
+            levels[time, container] = heights[time, stack]
+
+        for values, variables in ((slots, self.slot), (tiers, self.tier), (levels, self.level), (heights, self.height), (plan.lifetimes(), self.lifetime)):
+            for row, values_row in zip(variables, values.tolist()):
+                for variable, value in zip(row, values_row):
+                    model.AddHint(variable, int(value))
+
+        for action, variables in ((IDLE, self.idle), (EMPLACE, self.emplace), (REMOVE, self.remove), (INSERT, self.insert)):
+            for variable, value in zip(variables, plan.actions.tolist()):
+                model.AddHint(variable, int(value == action))
+
+        for row, values_row in zip(self.moved, (slots[1:] != slots[:-1]).tolist()):
+            for variable, value in zip(row, values_row):
+                model.AddHint(variable, int(value))
+
+    # Reads the whole solution back into the same Plan as ContainerMatrix.plan
+    def plan(self, model : Model) -> Plan:
+        slots = model.Values(self.slot)
+
+        grid = numpy.full((self.t, self.yard), EMPTY, dtype=numpy.int16)
+        time, container = numpy.nonzero(slots < self.yard)
+        grid[time, slots[time, container]] = container
+        grid = grid.reshape(self.t, self.s, self.h)
+
+        actions = model.Values([self.idle, self.emplace, self.remove, self.insert]).argmax(axis=0).astype(numpy.int8)
+
+        moves = numpy.full((self.t - 1, 4), EMPTY, dtype=numpy.int16)
+        for time in numpy.nonzero(actions != IDLE)[0]:
+            # Only the moved container's slot changes, from its 'out' place to its 'in' place
+            container = numpy.nonzero(slots[time] != slots[time + 1])[0][0]
+            for column, slot in ((0, slots[time, container]), (2, slots[time + 1, container])):
+                if slot < self.yard:
+                    moves[time, column : column + 2] = divmod(slot, self.h)
+
+        return Plan(grid, actions, moves, self.c)
+
+    def print_solution(self, model : Model, detail : bool = False, labels : Union[List[str], str] = None):
+        self.plan(model).print_solution(labels, detail)
+
+    def decisions(self, model : Model) -> List[str]:
+        actions = model.Values([self.idle, self.emplace, self.remove, self.insert]).argmax(axis=0)
+        return [ACTION_NAMES[action] for action in actions]
+
+    def visualize(self, model : Model, shipments : List[dict], labels : Union[List[str], str] = None):
+        self.plan(model).visualize(shipments, labels)
@@ -0,0 +1,226 @@
+import heapq
+from itertools import count
+from timeit import default_timer as timer
+from typing import List, Union
+
+import numpy
+
+from Plan import Plan, IDLE, EMPLACE, REMOVE, INSERT, EMPTY
+
+# An emplace during a ship loses an idle and a ship idle, during a gap only an idle (see ship_loading_objective).
+# Removes and inserts are the same in every plan, so they're free
+SHIP_EMPLACE_COST = 100001
+GAP_EMPLACE_COST = 1
+
+FINISH = None
+
+class Windows:
+    # The shipments as windows of actions. A state (w, t, yard) is at timestep t inside window w, and the yard is a
+    # tuple of stacks, each a tuple of containers from the bottom up. Window len(shipments) is the end of the plan
+    def __init__(self, shipments : List[dict], index_lookup : dict, weight_array : List[int], height : int) -> None:
+        self.n = len(shipments)
+        self.height = height
+        self.weight_array = weight_array
+        self.ship = ["in" in shipment for shipment in shipments]
+        self.ins = [frozenset(index_lookup[c] for c in shipment.get("in", [])) for shipment in shipments]
+        self.outs = [frozenset(index_lookup[c] for c in shipment.get("out", [])) for shipment in shipments]
+
+        self.start = [0]
+        for shipment in shipments:
+            self.start.append(self.start[-1] + shipment["duration"])
+        # The last timestep of the horizon has no action after it
+        self.end = self.start[1:]
+        self.end[-1] -= 1
+
+        # The ship each container leaves with, containers that stay leave after every window
+        self.leave = [self.n] * len(index_lookup)
+        for w in reversed(range(self.n)):
+            for container in self.outs[w]:
+                self.leave[container] = w
+
+    def fits(self, container : int, stack : tuple) -> bool:
+        return len(stack) < self.height and (not stack or self.weight_array[stack[-1]] >= self.weight_array[container])
+
+    # Containers that must be emplaced at least once, for each window they must be moved by: those above a container
+    # that leaves before them. Each emplace moves one of them, so there are at least this many emplaces left
+    def blockers(self, yard : tuple) -> List[int]:
+        due = [0] * (self.n + 1)
+        for stack in yard:
+            first_leave = self.n
+            for container in stack:
+                if first_leave < self.leave[container]:
+                    due[first_leave] += 1
+                first_leave = min(first_leave, self.leave[container])
+        return due
+
+    # Admissible lower bound of the cost left. Blockers of a ship can be emplaced cheaply in the gaps before it, as long
+    # as there are enough steps left in them, and the rest cost as much as an emplace during a ship
+    def lower_bound(self, w : int, t : int, yard : tuple) -> int:
+        due = self.blockers(yard)
+        cheap_steps = 0
+        needed = 0
+        expensive = 0
+        for window in range(w, self.n):
+            if not self.ship[window]:
+                cheap_steps += self.end[window] - max(t, self.start[window])
+            needed += due[window]
+            expensive = max(expensive, needed - cheap_steps)
+        return expensive * SHIP_EMPLACE_COST + (sum(due) - expensive) * GAP_EMPLACE_COST
+
+    # Successors as (cost, (w, t, yard), action, move), where FINISH idles up to the end of the window
+    def successors(self, w : int, t : int, yard : tuple):
+        steps = self.end[w] - t
+        if self.ship[w]:
+            in_yard = {container for stack in yard for container in stack}
+            pending_out = self.outs[w] & in_yard
+            pending_in = self.ins[w] - in_yard
+            if not pending_out and not pending_in:
+                yield 0, (w + 1, self.end[w], yard), FINISH, None
+
+            # Removing a leaving container as soon as it's on top never makes the plan worse
+            for s, stack in enumerate(yard):
+                if stack and stack[-1] in pending_out:
+                    child = yard[:s] + (stack[:-1],) + yard[s + 1:]
+                    yield 0, (w, t + 1, child), REMOVE, (s, len(stack) - 1, EMPTY, EMPTY)
+                    return
+
+            if len(pending_out) + len(pending_in) + self.blockers(yard)[w] > steps:
+                return # Not enough steps left to finish the ship
+
+            for container in sorted(pending_in):
+                for s in self.targets(container, yard, None):
+                    child = yard[:s] + (yard[s] + (container,),) + yard[s + 1:]
+                    yield 0, (w, t + 1, child), INSERT, (EMPTY, EMPTY, s, len(yard[s]))
+            cost = SHIP_EMPLACE_COST
+        else:
+            yield 0, (w + 1, self.end[w], yard), FINISH, None
+            cost = GAP_EMPLACE_COST
+
+        if steps <= 0:
+            return
+        for source, stack in enumerate(yard):
+            if not stack:
+                continue
+            for target in self.targets(stack[-1], yard, source):
+                child = list(yard)
+                child[source] = stack[:-1]
+                child[target] = yard[target] + (stack[-1],)
+                yield cost, (w, t + 1, tuple(child)), EMPLACE, (source, len(stack) - 1, target, len(yard[target]))
+
+    # Stacks the container can be put on. Empty stacks are interchangeable, so only the first one is tried
+    def targets(self, container : int, yard : tuple, source : Union[int, None]) -> List[int]:
+        targets = []
+        empty_tried = False
+        for s, stack in enumerate(yard):
+            if s == source or not self.fits(container, stack):
+                continue
+            if not stack:
+                if empty_tried:
+                    continue
+                empty_tried = True
+            targets.append(s)
+        return targets
+
+# Lays the states of the path out on the timeline, one action per timestep
+def path_plan(path : list, t : int, length : int, height : int, c : int) -> Plan:
+    grid = numpy.full((t, length, height), EMPTY, dtype=numpy.int16)
+    actions = numpy.full(t - 1, IDLE, dtype=numpy.int8)
+    moves = numpy.full((t - 1, 4), EMPTY, dtype=numpy.int16)
+
+    def fill_grid(time, yard):
+        for s, stack in enumerate(yard):
+            grid[time, s, :len(stack)] = stack
+
+    (_, time, yard), _, _ = path[0]
+    fill_grid(time, yard)
+    for ((_, next_time, next_yard), action, move) in path[1:]:
+        if action is not FINISH:
+            actions[time], moves[time] = action, move
+        for step in range(time + 1, next_time + 1):
+            fill_grid(step, next_yard)
+        time = next_time
+    return Plan(grid, actions, moves, c)
+
+def a_star(windows : Windows, root : tuple, deadline : Union[float, None]):
+    tie = count()
+    best = {root: 0}
+    parents = {root: None}
+    frontier = [(windows.lower_bound(*root), next(tie), 0, root)]
+
+    while frontier:
+        _, _, g, state = heapq.heappop(frontier)
+        if g > best[state]:
+            continue # Reached again more cheaply after it was queued
+        if state[0] == windows.n:
+            return state, parents
+        if deadline is not None and timer() > deadline:
+            return None, parents
+
+        for cost, child, action, move in windows.successors(*state):
+            if g + cost < best.get(child, float("inf")):
+                best[child] = g + cost
+                parents[child] = (state, action, move)
+                heapq.heappush(frontier, (g + cost + windows.lower_bound(*child), next(tie), g + cost, child))
+    return None, parents
+
+# States are expanded in timeline order, keeping only the width most promising of each (t, w)
+def beam(windows : Windows, root : tuple, width : int, deadline : Union[float, None]):
+    best = {root: 0}
+    parents = {root: None}
+    layers = {(root[1], root[0]): {root}}
+    order = [(root[1], root[0])]
+
+    while order:
+        layer = heapq.heappop(order)
+        states = layers.pop(layer)
+        if layer[1] == windows.n:
+            return min(states, key=best.get), parents
+        if deadline is not None and timer() > deadline:
+            return None, parents
+
+        # Ties are broken on the state itself, so the beam doesn't depend on the set's order
+        for state in sorted(states, key=lambda state: (best[state] + windows.lower_bound(*state), state))[:width]:
+            for cost, child, action, move in windows.successors(*state):
+                if best[state] + cost < best.get(child, float("inf")):
+                    best[child] = best[state] + cost
+                    parents[child] = (state, action, move)
+                    key = (child[1], child[0])
+                    if key not in layers:
+                        layers[key] = set()
+                        heapq.heappush(order, key)
+                    layers[key].add(child)
+    return None, parents
+
+# Exact search over yard states: A* (or beam search, keeping width states per timestep) with a transposition table of
+# the cheapest way to reach each state, and the blocking containers as a lower bound. Each ship removes its 'out'
+# containers and inserts its 'in' ones, and gaps only allow emplaces. With no width, the plan found is optimal.
+# Returns None if there's no plan, or the search runs out of time
+def search_plan(initial_container_positions : list, shipments : List[dict], weights, index_lookup : dict, length : int, height : int,
+        width : int = None, max_time : float = None) -> Union[Plan, None]:
+    weights = {label:1 for label in index_lookup} if weights == False else weights
+    weight_array = [0] * len(index_lookup)
+    for c, weight in weights.items():
+        weight_array[index_lookup[c]] = weight
+
+    stacks = [[] for _ in range(length)]
+    for label, s, h in sorted(initial_container_positions, key=lambda position: position[2]):
+        stacks[s].append(index_lookup[label])
+
+    windows = Windows(shipments, index_lookup, weight_array, height)
+    root = (0, 0, tuple(tuple(stack) for stack in stacks))
+    deadline = None if max_time is None else timer() + max_time
+
+    if width is None:
+        goal, parents = a_star(windows, root, deadline)
+    else:
+        goal, parents = beam(windows, root, width, deadline)
+    if goal is None:
+        return None
+
+    path = []
+    state = goal
+    while state is not None:
+        parent = parents[state]
+        path.append((state, *(parent[1:] if parent else (None, None))))
+        state = parent[0] if parent else None
+    return path_plan(path[::-1], windows.start[-1], length, height, len(index_lookup))
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import glob
+import json
+import os
+from multiprocessing import Pool
+from timeit import default_timer as timer
+
+from main import build_from_json, build_options, strictly_positive_int, positive_float, FORMULATIONS
+from Model import BACKENDS
+
+# The build options are part of every row, so that rows from runs with different options can be told apart
+RESULT_FIELDS = ["path", "solver", "formulation", "encoding", "presolve", "symmetry", "bounds", "hint", "status", "objective", "build_time", "solve_time"]
+
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths += sorted(os.path.join(pattern, name) for name in os.listdir(pattern) if os.path.isfile(os.path.join(pattern, name)))
+        else:
+            paths += sorted(glob.glob(pattern))
+    return paths
+
+def status_name(model, status):
+    if status == model.OPTIMAL:
+        return "OPTIMAL"
+    elif status == model.FEASIBLE:
+        return "FEASIBLE"
+    else:
+        return "NO_SOLUTION"
+
+# Runs in a pool worker: builds and solves a single instance, and returns one result row
+def solve_instance(task : dict) -> dict:
+    args = argparse.Namespace(**task)
+    result = {"path": args.path, "solver": args.solver, **build_options(args), "hint": args.hint}
+
+    try:
+        compiled = build_from_json(args, logs=False)
+        model = compiled["model"]
+
+        solve_start = timer()
+        solution = model.Solve(args.time, args.execfile, workers=args.threads)
+
+        result.update({
+            "status": status_name(model, solution["status"]),
+            "objective": solution["objective"],
+            "build_time": compiled["build_time"],
+            "solve_time": timer() - solve_start
+        })
+    except Exception as e:
+        # A broken instance (or a missing solver) shouldn't take down the whole batch
+        result.update({"status": "ERROR", "error": repr(e)})
+
+    return result
+
+def run_batch(args : object):
+    paths = expand_paths(args.paths)
+    if not paths:
+        raise Exception("No instances found")
+
+    # The CPU budget is split between pool workers and the solver threads inside each of them
+    workers = max(1, min(args.workers, len(paths) * len(args.solver)))
+    threads = max(1, args.cpus // workers)
+
+    tasks = [
+        {
+            "path": path,
+            "solver": solver,
+            "encoding": args.encoding,
+            "formulation": args.formulation,
+            "presolve": args.presolve,
+            "symmetry": args.symmetry,
+            "bounds": args.bounds,
+            "hint": args.hint,
+            "profile": False,
+            "profile_file": None,
+            "time": args.time,
+            "execfile": args.execfile,
+            "cache": args.cache,
+            "cache_size": args.cache_size,
+            "threads": threads
+        }
+        for solver in args.solver for path in paths
+    ]
+
+    print(f"Solving {len(tasks)} instances with {workers} workers x {threads} solver threads")
+
+    with open(args.output, "w", newline="") as f:
+        use_csv = args.output.endswith(".csv")
+        if use_csv:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS + ["error"])
+            writer.writeheader()
+
+        with Pool(workers) as pool:
+            # Results are written as soon as each instance finishes, not in submission order
+            for result in pool.imap_unordered(solve_instance, tasks):
+                if use_csv:
+                    writer.writerow(result)
+                else:
+                    f.write(json.dumps(result) + "\n")
+                f.flush()
+
+                print(result["solver"], result["path"], result["status"], result.get("objective"))
+
+if __name__ == '__main__':
+    my_parser = argparse.ArgumentParser(description='Solve a batch of Container Stacking Problem instances in parallel')
+
+    my_parser.add_argument('-solver',
+        metavar='--solver-package',
+        type=str,
+        nargs='+',
+        required=True,
+        choices=list(BACKENDS),
+        help="solvers to run every instance with. Currently supports 'ortools', 'cplex' and any other registered backend")
+
+    my_parser.add_argument('-paths',
+        metavar='--input-paths',
+        type=str,
+        nargs='+',
+        required=True,
+        help="directories or glob patterns of input problems, e.g. 'inputs/constantContainers_*'")
+
+    my_parser.add_argument('-output',
+        metavar='--output-path',
+        type=str,
+        default='results.jsonl',
+        help="file the results are streamed to. Written as CSV if it ends in '.csv', JSONL otherwise. By default is 'results.jsonl'")
+
+    my_parser.add_argument('-workers',
+        metavar='--pool-workers',
+        type=strictly_positive_int,
+        default=os.cpu_count(),
+        help="number of instances solved at the same time. By default is the number of CPUs")
+
+    my_parser.add_argument('-cpus',
+        metavar='--cpu-budget',
+        type=strictly_positive_int,
+        default=os.cpu_count(),
+        help="total number of CPUs to use, split evenly between the pool workers' solver threads. By default is the number of CPUs")
+
+    my_parser.add_argument('-encoding',
+        metavar='--variable-encoding',
+        type=str,
+        default='integer',
+        choices=['integer', 'boolean'],
+        help="how binary matrix cells are declared. 'boolean' uses native boolean variables as enforcement literals. By default is 'integer'")
+
+    my_parser.add_argument('-formulation',
+        metavar='--model-formulation',
+        type=str,
+        default='grid',
+        choices=list(FORMULATIONS),
+        help="how the yard is modelled, 'grid' or 'position' (see main.py). By default is 'grid'")
+
+    my_parser.add_argument('-presolve',
+        action='store_true',
+        help="only create occupancy variables inside each container's lifetime window, derived from the shipments")
+
+    my_parser.add_argument('-symmetry',
+        action='store_true',
+        help="add symmetry breaking constraints for initially empty stacks and interchangeable containers")
+
+    my_parser.add_argument('-bounds',
+        action='store_true',
+        help="add redundant lower bounds on the emplaces needed by each ship, and the objective bound they imply (see main.py)")
+
+    my_parser.add_argument('-hint',
+        action='store_true',
+        help="warm start the solver with the plan found by the greedy heuristic")
+
+    my_parser.add_argument('-time',
+        metavar='--max-time',
+        nargs='?',
+        type=positive_float,
+        default=None,
+        help="time limit (in seconds) for each solve")
+
+    my_parser.add_argument('-execfile',
+        metavar='--cplex-execfile',
+        nargs='?',
+        type=str,
+        default=None,
+        help="path for the CPLEX engine's executable")
+
+    my_parser.add_argument('-cache',
+        metavar='--cache-directory',
+        nargs='?',
+        type=str,
+        default=None,
+        const='.model_cache',
+        help="reuse compiled models stored in this directory. By default caching is disabled; '-cache' alone uses '.model_cache'")
+
+    my_parser.add_argument('-cache-size',
+        metavar='--cache-max-size',
+        type=positive_float,
+        default=512,
+        help="maximum size (in MB) of the compiled model cache. By default is 512")
+
+    run_batch(my_parser.parse_args())
@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import resource
+import sys
+from itertools import product
+from multiprocessing import Pool
+from timeit import default_timer as timer
+
+from batch import status_name
+from generate import generate_instance, WEIGHT_DISTRIBUTIONS
+from Model import load_backend, BACKENDS
+from main import build_from_json, positive_int, positive_float, print_cond, FORMULATIONS
+
+PARAMETERS = ["stacks", "tiers", "containers", "shipments", "weights", "seed"]
+
+def case_key(case : dict) -> str:
+    # The grid formulation is left out of the key, so baselines from before formulations existed still match
+    formulation = [] if case["formulation"] == 'grid' else [case["formulation"]]
+    return " ".join([case["solver"]] + formulation + [f"{parameter}={case[parameter]}" for parameter in PARAMETERS])
+
+# Runs in a fresh pool worker for every case, so that the peak RSS is the case's own
+def run_case(case : dict) -> dict:
+    args = argparse.Namespace(**case)
+    result = {"key": case_key(case), **{parameter: case[parameter] for parameter in ["solver", "formulation"] + PARAMETERS}}
+
+    try:
+        # A fresh worker hasn't imported the solver library yet, which isn't part of the build
+        import_start = timer()
+        load_backend(args.solver)
+        result["import_time"] = timer() - import_start
+
+        compiled = build_from_json(args, logs=False)
+        model = compiled["model"]
+
+        # The fastest run is the least disturbed by the rest of the machine
+        solve_times = []
+        for run in range(args.runs):
+            solve_start = timer()
+            solution = model.Solve(args.time, args.execfile, workers=args.threads)
+            solve_times.append(timer() - solve_start)
+
+        result.update({
+            "timesteps": compiled["matrix"].t,
+            "variables": model.variables_created,
+            "constraints": model.constraints_added,
+            "build_time": compiled["build_time"],
+            "solve_time": min(solve_times),
+            "objective": solution["objective"],
+            "status": status_name(model, solution["status"])
+        })
+    except Exception as e:
+        result.update({"status": "ERROR", "error": repr(e)})
+
+    # ru_maxrss is in kilobytes on Linux
+    result["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+def regressions(result : dict, baseline : dict, tolerance : float, min_delta : float) -> list:
+    found = []
+    solved = ("OPTIMAL", "FEASIBLE")
+
+    if baseline["status"] in solved and result["status"] not in solved:
+        return [f"status {baseline['status']} -> {result['status']}"]
+    if result["status"] not in solved:
+        return found
+
+    for metric in ("build_time", "solve_time"):
+        # Short times are mostly noise, so they must also grow by min_delta seconds
+        if result[metric] > baseline[metric] * (1 + tolerance) and result[metric] - baseline[metric] > min_delta:
+            found.append(f"{metric} {baseline[metric]:.3f}s -> {result[metric]:.3f}s")
+    if result["peak_rss"] > baseline["peak_rss"] * (1 + tolerance):
+        found.append(f"peak_rss {baseline['peak_rss']:.1f}MB -> {result['peak_rss']:.1f}MB")
+    # The objective is maximized
+    if baseline["status"] == "OPTIMAL" and result["objective"] < baseline["objective"]:
+        found.append(f"objective {baseline['objective']} -> {result['objective']}")
+    return found
+
+def print_scaling(results : list, baselines : dict):
+    print(f"{'Case':68} | {'T':>4} | {'Variables':>9} | {'Constraints':>11} | {'Build (s)':>9} | {'Solve (s)':>9} | {'Objective':>10} | {'Status':>11} | {'RSS (MB)':>8} | vs baseline")
+    # Ordered by solver, formulation and then model size, so each solver's rows read as a scaling curve
+    for result in sorted(results, key=lambda result: (result["solver"], result.get("formulation", 'grid'), result.get("variables", 0))):
+        baseline = baselines.get(result["key"])
+        comparison = ""
+        if baseline is not None and "build_time" in baseline and "build_time" in result:
+            comparison = f"build x{result['build_time'] / baseline['build_time']:.2f}, solve x{result['solve_time'] / max(baseline['solve_time'], 1e-9):.2f}"
+
+        print(f"{result['key']:68} | {result.get('timesteps', ''):>4} | {result.get('variables', ''):>9} | {result.get('constraints', ''):>11} | "
+            f"{result.get('build_time', 0):9.3f} | {result.get('solve_time', 0):9.3f} | {str(result.get('objective')):>10} | {result['status']:>11} | {result['peak_rss']:8.1f} | {comparison}")
+
+def run_benchmark(args : object) -> bool:
+    os.makedirs(args.instances, exist_ok=True)
+
+    cases = []
+    for stacks, tiers, containers, shipments, weights, seed in product(args.stacks, args.tiers, args.containers, args.shipments, args.weights, args.seeds):
+        if containers > stacks * tiers:
+            continue
+
+        path = os.path.join(args.instances, f"s{stacks}_t{tiers}_c{containers}_n{shipments}_{weights}_{seed}.json")
+        with open(path, "w") as f:
+            json.dump(generate_instance(stacks, tiers, containers, shipments, args.moves, args.gap, weights, args.weight_classes, seed), f)
+
+        for solver, formulation in product(args.solver, args.formulation):
+            cases.append({
+                "path": path,
+                "solver": solver,
+                "formulation": formulation,
+                "stacks": stacks,
+                "tiers": tiers,
+                "containers": containers,
+                "shipments": shipments,
+                "weights": weights,
+                "seed": seed,
+                "encoding": args.encoding,
+                "presolve": args.presolve,
+                "symmetry": args.symmetry,
+                "bounds": args.bounds,
+                "hint": False,
+                "profile": False,
+                "profile_file": None,
+                "cache": None,
+                "cache_size": 0,
+                "time": args.time,
+                "execfile": args.execfile,
+                "threads": args.threads,
+                "runs": args.runs
+            })
+
+    print(f"Running {len(cases)} benchmark cases")
+
+    results = []
+    # Cases run one at a time, so they don't compete for the CPUs and their timings stay comparable
+    with Pool(1, maxtasksperchild=1) as pool:
+        for result in pool.imap(run_case, cases):
+            print(result["key"], result["status"], result.get("objective"), flush=True)
+            results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump({"results": results}, f, indent=4)
+
+    baselines = {}
+    if args.baseline and os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baselines = {result["key"] : result for result in json.load(f)["results"]}
+
+    print_scaling(results, baselines)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"results": results}, f, indent=4)
+        print(f"Baseline written to '{args.baseline}'")
+        return True
+
+    found = False
+    for result in results:
+        if result["key"] in baselines:
+            for regression in regressions(result, baselines[result["key"]], args.tolerance, args.min_delta):
+                print(f"REGRESSION {result['key']}: {regression}")
+                found = True
+    print_cond(bool(baselines), "No regressions against the baseline" if not found else "Regressions found against the baseline")
+    return not found
+
+if __name__ == '__main__':
+    my_parser = argparse.ArgumentParser(description='Benchmark the Container Stacking Problem models on generated instances of growing size')
+
+    my_parser.add_argument('-solver',
+        metavar='--solver-package',
+        type=str,
+        nargs='+',
+        default=['ortools'],
+        choices=list(BACKENDS),
+        help="solvers (registered backends) to benchmark. By default is 'ortools'")
+
+    my_parser.add_argument('-formulation',
+        metavar='--model-formulation',
+        type=str,
+        nargs='+',
+        default=['grid'],
+        choices=list(FORMULATIONS),
+        help="model formulations to benchmark, 'grid' and/or 'position'. By default is 'grid'")
+
+    my_parser.add_argument('-stacks',
+        metavar='--yard-stacks',
+        type=positive_int,
+        nargs='+',
+        default=[4],
+        help="stack counts to sweep. By default is 4")
+
+    my_parser.add_argument('-tiers',
+        metavar='--yard-tiers',
+        type=positive_int,
+        nargs='+',
+        default=[3],
+        help="tier counts to sweep. By default is 3")
+
+    my_parser.add_argument('-containers',
+        metavar='--initial-containers',
+        type=positive_int,
+        nargs='+',
+        default=[4, 6],
+        help="initial container counts to sweep. By default is 4 6")
+
+    my_parser.add_argument('-shipments',
+        metavar='--ships',
+        type=positive_int,
+        nargs='+',
+        default=[1, 2],
+        help="ship counts to sweep. By default is 1 2")
+
+    my_parser.add_argument('-weights',
+        metavar='--weight-distribution',
+        type=str,
+        nargs='+',
+        default=['none'],
+        choices=WEIGHT_DISTRIBUTIONS,
+        help="weight distributions to sweep (see generate.py). By default is 'none'")
+
+    my_parser.add_argument('-seeds',
+        metavar='--random-seeds',
+        type=int,
+        nargs='+',
+        default=[0],
+        help="instance seeds to sweep. By default is 0")
+
+    my_parser.add_argument('-moves',
+        metavar='--max-moves',
+        type=positive_int,
+        default=3,
+        help="maximum number of containers each ship takes, and brings. By default is 3")
+
+    my_parser.add_argument('-gap',
+        metavar='--gap-duration',
+        type=positive_int,
+        default=2,
+        help="duration of the gaps between ships. By default is 2")
+
+    my_parser.add_argument('-weight-classes',
+        metavar='--weight-classes',
+        type=positive_int,
+        default=3,
+        help="number of different weights. By default is 3")
+
+    my_parser.add_argument('-encoding',
+        metavar='--variable-encoding',
+        type=str,
+        default='integer',
+        choices=['integer', 'boolean'],
+        help="how binary matrix cells are declared. By default is 'integer'")
+
+    my_parser.add_argument('-presolve',
+        action='store_true',
+        help="only create occupancy variables inside each container's lifetime window")
+
+    my_parser.add_argument('-symmetry',
+        action='store_true',
+        help="add symmetry breaking constraints")
+
+    my_parser.add_argument('-bounds',
+        action='store_true',
+        help="add redundant emplace lower bounds, and the objective bound they imply")
+
+    my_parser.add_argument('-time',
+        metavar='--max-time',
+        type=positive_float,
+        default=60,
+        help="time limit (in seconds) for each solve. By default is 60")
+
+    my_parser.add_argument('-execfile',
+        metavar='--cplex-execfile',
+        nargs='?',
+        type=str,
+        default=None,
+        help="path for the CPLEX engine's executable")
+
+    my_parser.add_argument('-threads',
+        metavar='--search-workers',
+        type=positive_int,
+        default=None,
+        help="search workers of each solve. By default the solver decides")
+
+    my_parser.add_argument('-runs',
+        metavar='--solve-runs',
+        type=positive_int,
+        default=1,
+        help="solves of each case, the fastest one is reported. By default is 1")
+
+    my_parser.add_argument('-instances',
+        metavar='--instance-directory',
+        type=str,
+        default='.benchmark',
+        help="directory the generated instances are written to. By default is '.benchmark'")
+
+    my_parser.add_argument('-output',
+        metavar='--output-path',
+        type=str,
+        default='benchmark.json',
+        help="file the results are written to. By default is 'benchmark.json'")
+
+    my_parser.add_argument('-baseline',
+        metavar='--baseline-path',
+        type=str,
+        default=None,
+        help="results of a previous run (a benchmark output file) to compare against. The exit code is 1 if anything regressed")
+
+    my_parser.add_argument('-update-baseline',
+        action='store_true',
+        help="write the results to the baseline file instead of comparing against it")
+
+    my_parser.add_argument('-tolerance',
+        metavar='--relative-tolerance',
+        type=positive_float,
+        default=0.25,
+        help="relative growth of build time, solve time or peak RSS that counts as a regression. By default is 0.25")
+
+    my_parser.add_argument('-min-delta',
+        metavar='--minimum-seconds',
+        type=positive_float,
+        default=0.1,
+        help="times must also grow by this many seconds to count as a regression, as short ones are mostly noise. By default is 0.1")
+
+    sys.exit(0 if run_benchmark(my_parser.parse_args()) else 1)
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+from timeit import default_timer as timer
+
+from generate import generate_instance, WEIGHT_DISTRIBUTIONS
+from LNS import lns_search, NEIGHBOURHOODS
+from Model import BACKENDS, load_backend
+from main import build_from_json, read_input, starting_plan, ship_loading_objective, positive_int, strictly_positive_int, positive_float
+from Plan import IDLE
+
+# Objective over time of one plain solve of the whole model, timed from the start of its build
+def plain_curve(args : object) -> list:
+    start = timer()
+    compiled = build_from_json(args, logs=False)
+    model = compiled["model"]
+
+    curve = []
+    def on_solution(intermediate):
+        curve.append((timer() - start, intermediate["objective"]))
+    model.Solve(max(0.0, args.time - (timer() - start)), args.execfile, workers=args.cpus, on_solution=on_solution)
+    return curve
+
+# Objective over time of the neighbourhood search, timed from the start of the heuristic plan it starts from
+def lns_curve(args : object) -> list:
+    start = timer()
+    data, _, index_lookup = read_input(args.path)
+    plan = starting_plan(data, index_lookup, args.time)
+    if plan is None:
+        return []
+    objective = ship_loading_objective((plan.actions == IDLE).tolist(), data["shipments"])
+
+    curve = [(timer() - start, objective)]
+    def on_improvement(improvement, plan):
+        curve.append((timer() - start, improvement["objective"]))
+    lns_search(build_from_json, args, plan, objective, args.neighbourhoods, args.time - (timer() - start), args.neighbourhood_time,
+        args.processes, max(1, args.cpus // args.processes), args.seed, on_improvement)
+    return curve
+
+# Best objective found by each checkpoint
+def objective_at(curve : list, checkpoint : float):
+    found = [objective for time, objective in curve if time <= checkpoint]
+    return max(found) if found else None
+
+def run_curves(args : object):
+    os.makedirs(args.instances, exist_ok=True)
+    paths = list(args.paths or [])
+    for seed in args.seeds:
+        path = os.path.join(args.instances, f"s{args.stacks}_t{args.tiers}_c{args.containers}_n{args.shipments}_{args.weights}_{seed}.json")
+        with open(path, "w") as f:
+            json.dump(generate_instance(args.stacks, args.tiers, args.containers, args.shipments, args.moves, args.gap, args.weights, 3, seed), f)
+        paths.append(path)
+
+    # The solver library is imported up front, so neither method pays for it
+    load_backend(args.solver)
+    checkpoints = [args.time * (i + 1) / args.checkpoints for i in range(args.checkpoints)]
+    print(f"{'Instance':44} | {'Method':5} | " + " | ".join(f"{checkpoint:9.1f}s" for checkpoint in checkpoints))
+
+    results = []
+    for path in paths:
+        case = argparse.Namespace(**{**vars(args), "path": path})
+        curves = {"cp": plain_curve(case), "lns": lns_curve(case)}
+        for method, curve in curves.items():
+            print(f"{path[-44:]:44} | {method:5} | " + " | ".join(f"{str(objective_at(curve, checkpoint)):>10}" for checkpoint in checkpoints), flush=True)
+        results.append({"path": path, **curves})
+
+    with open(args.output, "w") as f:
+        json.dump({"time": args.time, "neighbourhoods": args.neighbourhoods, "processes": args.processes, "results": results}, f, indent=4)
+
+if __name__ == '__main__':
+    my_parser = argparse.ArgumentParser(description='Compare the objective over time of the neighbourhood search and of solving the whole model')
+
+    my_parser.add_argument('-solver',
+        metavar='--solver-package',
+        type=str,
+        default='ortools',
+        choices=list(BACKENDS),
+        help="solver of both methods. By default is 'ortools'")
+
+    my_parser.add_argument('-paths',
+        metavar='--input-paths',
+        type=str,
+        nargs='+',
+        default=None,
+        help="input problems to compare on, besides the generated ones")
+
+    my_parser.add_argument('-stacks',
+        metavar='--yard-stacks',
+        type=positive_int,
+        default=8,
+        help="number of stacks of the generated instances. By default is 8")
+
+    my_parser.add_argument('-tiers',
+        metavar='--yard-tiers',
+        type=positive_int,
+        default=5,
+        help="maximum height of the stacks of the generated instances. By default is 5")
+
+    my_parser.add_argument('-containers',
+        metavar='--initial-containers',
+        type=positive_int,
+        default=24,
+        help="number of containers initially in the yard of the generated instances. By default is 24")
+
+    my_parser.add_argument('-shipments',
+        metavar='--ships',
+        type=positive_int,
+        default=3,
+        help="number of ships of the generated instances. By default is 3")
+
+    my_parser.add_argument('-moves',
+        metavar='--max-moves',
+        type=positive_int,
+        default=5,
+        help="maximum number of containers each ship takes, and brings. By default is 5")
+
+    my_parser.add_argument('-gap',
+        metavar='--gap-duration',
+        type=positive_int,
+        default=2,
+        help="duration of the gaps between ships. By default is 2")
+
+    my_parser.add_argument('-weights',
+        metavar='--weight-distribution',
+        type=str,
+        default='none',
+        choices=WEIGHT_DISTRIBUTIONS,
+        help="container weights of the generated instances (see generate.py). By default is 'none'")
+
+    my_parser.add_argument('-seeds',
+        metavar='--random-seeds',
+        type=int,
+        nargs='*',
+        default=[0],
+        help="seeds of the generated instances, one instance each. By default is 0")
+
+    my_parser.add_argument('-time',
+        metavar='--max-time',
+        type=positive_float,
+        default=60,
+        help="time limit (in seconds) of each method, build included. By default is 60")
+
+    my_parser.add_argument('-checkpoints',
+        metavar='--checkpoint-count',
+        type=positive_int,
+        default=6,
+        help="number of evenly spaced times the best objectives are reported at. By default is 6")
+
+    my_parser.add_argument('-neighbourhoods',
+        metavar='--neighbourhood-kinds',
+        type=str,
+        nargs='+',
+        choices=NEIGHBOURHOODS,
+        default=NEIGHBOURHOODS,
+        help="kinds of neighbourhood re-solved (see main.py). By default is all of them")
+
+    my_parser.add_argument('-neighbourhood-time',
+        metavar='--subsolve-time',
+        type=positive_float,
+        default=2,
+        help="time limit (in seconds) of each neighbourhood re-solve. By default is 2")
+
+    my_parser.add_argument('-processes',
+        metavar='--worker-processes',
+        type=strictly_positive_int,
+        default=1,
+        help="number of neighbourhoods re-solved at the same time. By default is 1")
+
+    my_parser.add_argument('-cpus',
+        metavar='--cpu-budget',
+        type=strictly_positive_int,
+        default=os.cpu_count(),
+        help="CPUs of each method: the search workers of the plain solve, split between the processes of the neighbourhood search. By default is the number of CPUs")
+
+    my_parser.add_argument('-seed',
+        metavar='--random-seed',
+        type=int,
+        default=None,
+        help="random seed of the neighbourhood choices")
+
+    my_parser.add_argument('-encoding',
+        metavar='--variable-encoding',
+        type=str,
+        default='integer',
+        choices=['integer', 'boolean'],
+        help="how binary matrix cells are declared. By default is 'integer'")
+
+    my_parser.add_argument('-presolve',
+        action='store_true',
+        help="only create occupancy variables inside each container's lifetime window")
+
+    my_parser.add_argument('-execfile',
+        metavar='--cplex-execfile',
+        type=str,
+        default=None,
+        help="path for the CPLEX engine's executable")
+
+    my_parser.add_argument('-instances',
+        metavar='--instance-directory',
+        type=str,
+        default='.curves',
+        help="directory the generated instances are written to. By default is '.curves'")
+
+    my_parser.add_argument('-output',
+        metavar='--output-path',
+        type=str,
+        default='curves.json',
+        help="file the curves are written to, as (time, objective) pairs. By default is 'curves.json'")
+
+    args = my_parser.parse_args()
+    # Options of the model build that aren't compared here
+    args.formulation = 'grid'
+    args.symmetry = False
+    args.bounds = False
+    args.hint = False
+    args.profile = False
+    args.profile_file = None
+    args.cache = None
+    run_curves(args)
@@ -0,0 +1,150 @@
+import argparse
+import json
+import random
+import string
+
+from main import index_input, plan_from_json, positive_int
+
+WEIGHT_DISTRIBUTIONS = ('none', 'uniform', 'heavy')
+
+def container_label(index : int) -> str:
+    # A, B, ..., Z, AA, AB, ...
+    label = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        label = string.ascii_uppercase[remainder] + label
+    return label
+
+def container_weight(rng : random.Random, distribution : str, classes : int) -> int:
+    if distribution == 'uniform':
+        return rng.randint(1, classes)
+    # Most containers are light, with a few heavy ones
+    return min(classes, int(rng.expovariate(1.0)) + 1)
+
+def draw_instance(rng : random.Random, stacks : int, tiers : int, containers : int, shipments : int, moves : int, weights : str, weight_classes : int):
+    weight = {}
+    def new_containers(count):
+        labels = [container_label(len(weight) + i) for i in range(count)]
+        for label in labels:
+            weight[label] = 1 if weights == 'none' else container_weight(rng, weights, weight_classes)
+        return labels
+
+    # Initial yard: heaviest containers at the bottom, spread over random stacks
+    initial = new_containers(containers)
+    heights = [0] * stacks
+    positions = []
+    for label in sorted(initial, key=lambda label: -weight[label]):
+        stack = rng.choice([s for s in range(stacks) if heights[s] < tiers])
+        positions.append([label, stack, heights[stack]])
+        heights[stack] += 1
+
+    yard = list(initial)
+    manifests = []
+    for _ in range(shipments):
+        out = rng.sample(yard, rng.randint(min(1, len(yard)), min(moves, len(yard))))
+        free = stacks * tiers - len(yard) + len(out)
+        in_ = new_containers(rng.randint(0 if out else 1, min(moves, free)))
+        yard = [label for label in yard if label not in out] + in_
+        manifests.append((in_, out))
+
+    return positions, manifests, weight
+
+# Random instance where every ship takes some of the containers in the yard and brings new ones, with a gap before
+# each ship. Ship durations start at the number of moves plus slack for relocations, and the slack is increased until
+# the greedy heuristic finds a plan, so generated instances are always feasible. Draws where it never does (e.g. with
+# weights that can't be stacked) are replaced by new ones, still determined by the seed
+def generate_instance(stacks : int, tiers : int, containers : int, shipments : int, moves : int = 3, gap : int = 2, weights : str = 'none', weight_classes : int = 3, seed : int = 0, attempts : int = 100) -> dict:
+    if containers > stacks * tiers:
+        raise Exception(f"{containers} containers don't fit in {stacks} stacks of {tiers} tiers")
+
+    for attempt in range(attempts):
+        rng = random.Random(f"{seed}:{attempt}")
+        positions, manifests, weight = draw_instance(rng, stacks, tiers, containers, shipments, moves, weights, weight_classes)
+
+        for slack in range(tiers, tiers * (stacks * tiers + 1), tiers):
+            data = {"containers": positions, "dimensions": [stacks, tiers], "shipments": [{"duration": 1}]}
+            for in_, out in manifests:
+                if len(data["shipments"]) > 1:
+                    data["shipments"].append({"duration": gap})
+                data["shipments"].append({"in": in_, "out": out, "duration": len(in_) + len(out) + slack})
+            if weights != 'none':
+                data["weights"] = weight
+
+            if plan_from_json(data, index_input(data)[1]) is not None:
+                return data
+
+    raise Exception("No feasible instance found for these parameters")
+
+if __name__ == '__main__':
+    my_parser = argparse.ArgumentParser(description='Generate a random Container Stacking Problem instance')
+
+    my_parser.add_argument('-stacks',
+        metavar='--yard-stacks',
+        type=positive_int,
+        default=4,
+        help="number of stacks in the yard. By default is 4")
+
+    my_parser.add_argument('-tiers',
+        metavar='--yard-tiers',
+        type=positive_int,
+        default=3,
+        help="maximum height of the stacks. By default is 3")
+
+    my_parser.add_argument('-containers',
+        metavar='--initial-containers',
+        type=positive_int,
+        default=6,
+        help="number of containers initially in the yard. By default is 6")
+
+    my_parser.add_argument('-shipments',
+        metavar='--ships',
+        type=positive_int,
+        default=2,
+        help="number of ships, each one preceded by a gap. By default is 2")
+
+    my_parser.add_argument('-moves',
+        metavar='--max-moves',
+        type=positive_int,
+        default=3,
+        help="maximum number of containers each ship takes, and brings. By default is 3")
+
+    my_parser.add_argument('-gap',
+        metavar='--gap-duration',
+        type=positive_int,
+        default=2,
+        help="duration of the gaps between ships. By default is 2")
+
+    my_parser.add_argument('-weights',
+        metavar='--weight-distribution',
+        type=str,
+        default='none',
+        choices=WEIGHT_DISTRIBUTIONS,
+        help="container weights: 'none', 'uniform' over the weight classes, or 'heavy' (mostly light, a few heavy). By default is 'none'")
+
+    my_parser.add_argument('-weight-classes',
+        metavar='--weight-classes',
+        type=positive_int,
+        default=3,
+        help="number of different weights. By default is 3")
+
+    my_parser.add_argument('-seed',
+        metavar='--random-seed',
+        type=int,
+        default=0,
+        help="random seed. By default is 0")
+
+    my_parser.add_argument('-output',
+        metavar='--output-path',
+        type=str,
+        default=None,
+        help="file the instance is written to (.json). By default it's printed")
+
+    args = my_parser.parse_args()
+    data = generate_instance(args.stacks, args.tiers, args.containers, args.shipments, args.moves, args.gap, args.weights, args.weight_classes, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=4)
+    else:
+        print(json.dumps(data))
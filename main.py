@@ -1,76 +1,135 @@
 import argparse
 import json
+import os
+import sys
+from typing import Union
+
+import numpy
 from timeit import default_timer as timer
 from inspect import getmembers, isfunction
-
-from numpy import number
+import time
 
 from ContainerMatrix import ContainerMatrix
-from Model import Model
+from PositionMatrix import PositionMatrix
+from Greedy import greedy_plan
+from Search import search_plan
+from LNS import lns_search, NEIGHBOURHOODS
+from InputCheck import input_problems, check_input
+from EmplaceBounds import emplace_lower_bounds
+from Model import Model, load_backend, BACKENDS
+from ModelCache import ModelCache
+from BuildProfile import BuildProfile
+from Plan import Plan, IDLE, EMPTY, concatenate
+from PlanFile import save_plan, save_moves
 import Constraints as Constraints
+import PositionConstraints as PositionConstraints
+
+# Model formulations: the matrix of variables, and the module with the constraints over it
+FORMULATIONS = {
+    'grid': (ContainerMatrix, Constraints),
+    'position': (PositionMatrix, PositionConstraints),
+}
+
+# Solvers that find a plan directly on the yard, without building a model
+PLANNERS = ['greedy', 'search']
 
 def positive_int(x):
     i = int(x)
     if i < 0:
         raise argparse.ArgumentTypeError("%s is an invalid positive integer value" % x)
     return i
+def strictly_positive_int(x):
+    i = int(x)
+    if i < 1:
+        raise argparse.ArgumentTypeError("%s is an invalid strictly positive integer value" % x)
+    return i
 def positive_float(x):
     f = float(x)
     if f < 0:
         raise argparse.ArgumentTypeError("%s is an invalid positive float value" % x)
     return f
 
+def solver_parameter(x):
+    name, separator, value = x.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError("%s is not in the form name=value" % x)
+    try:
+        return name, json.loads(value)
+    except json.JSONDecodeError:
+        return name, value
+
 def print_cond(b=True, str='', **kwargs):
     if b:
         print(str, **kwargs)
 
+def container_lifetime(container, initial_container_positions, shipments, time):
+    # This is the life cycle of the containers
+    dead       = [None, None]
+    in_        = [None, None]
+    alive      = [None, None]
+    out        = [None, None]
+    dead_again = [None, None]
+
+    dead = [0, 0]
+
+    if container in (c[0] for c in initial_container_positions):
+        in_   = [0, 0]
+        alive = [0, 0] # Already in the yard, so it may leave with the first shipment
+
+    for shipment in shipments:
+        if in_ == [None, None]:
+            if "in" not in shipment:
+                dead[1] += shipment["duration"]
+            elif container not in shipment["in"]:
+                dead[1] += shipment["duration"]
+            elif container in shipment["in"]:
+                in_ = [dead[1], dead[1] + shipment["duration"]]
+            else:
+                raise Exception("Unreachable code")
+            
+        elif alive == [None, None]:
+            alive = [in_[1], in_[1] + shipment["duration"]]
+
+        elif out == [None, None]:
+            if "out" not in shipment:
+                alive[1] += shipment["duration"]
+            elif container not in shipment["out"]:
+                alive[1] += shipment["duration"]
+            elif container in shipment["out"]:
+                out = [alive[1], alive[1] + shipment["duration"]]
+                dead_again = [alive[1] + shipment["duration"], time]
+                break
+            else:
+                raise Exception("Unreachable code")
+    
+    if out == [None, None] and dead_again == [None, None]:
+        out = [time, time]
+        dead_again = [time, time]
+
+    if in_ != [None, None] and alive == [None, None]:
+        alive = [in_[1], in_[1]] # Arrives with the last shipment, so it's never in the yard before the end
+    
+    return dead, in_, alive, out, dead_again
+
+# Presolve: a container can only be in the yard outside of its dead windows. Returns a (T, C) mask of where it can be
+def live_windows(labels, initial_container_positions, shipments, time) -> numpy.ndarray:
+    live = numpy.ones((time, len(labels)), dtype=bool)
+    for c, container in enumerate(labels):
+        dead, _, _, _, dead_again = container_lifetime(container, initial_container_positions, shipments, time)
+        live[dead[0]:dead[1], c] = False
+        live[dead_again[0]:dead_again[1], c] = False
+
+    # Mirrors the final shipment rule of enforce_container_lifetime_restrictions
+    final_shipment = shipments[-1]
+    if "in" in final_shipment and "out" in final_shipment:
+        for c in final_shipment["out"]:
+            live[-1, labels.index(c)] = False
+    return live
+
 def enforce_container_lifetime_restrictions(model : Model, matrix : ContainerMatrix, labels, index_lookup, initial_container_positions, shipments, time):
     for container in labels:
-        # This is the life cycle of the containers
-        dead       = [None, None]
-        in_        = [None, None]
-        alive      = [None, None]
-        out        = [None, None]
-        dead_again = [None, None]
-
-        dead = [0, 0]
-
-        for shipment in shipments:
-            if alive == [None, None] and container in (c[0] for c in initial_container_positions):
-                dead = [0, 0]
-                in_  = [0, 0]
-                alive = [0, shipment["duration"]]
-                continue
-
-            if in_ == [None, None]:
-                if "in" not in shipment:
-                    dead[1] += shipment["duration"]
-                elif container not in shipment["in"]:
-                    dead[1] += shipment["duration"]
-                elif container in shipment["in"]:
-                    in_ = [dead[1], dead[1] + shipment["duration"]]
-                else:
-                    raise Exception("Unreachable code")
-                
-            elif alive == [None, None]:
-                alive = [in_[1], in_[1] + shipment["duration"]]
-
-            elif out == [None, None]:
-                if "out" not in shipment:
-                    alive[1] += shipment["duration"]
-                elif container not in shipment["out"]:
-                    alive[1] += shipment["duration"]
-                elif container in shipment["out"]:
-                    out = [alive[1], alive[1] + shipment["duration"]]
-                    dead_again = [alive[1] + shipment["duration"], time]
-                    break
-                else:
-                    raise Exception("Unreachable code")
-        
-        if out == [None, None] and dead_again == [None, None]:
-            out = [time, time]
-            dead_again = [time, time]
-        
+        dead, in_, alive, out, dead_again = container_lifetime(container, initial_container_positions, shipments, time)
+
         # print(f"{dead=} {in_=} {alive=} {out=} {dead_again=}")
         # input()
 
@@ -96,7 +155,7 @@ def enforce_container_loading_restrictions(model : Model, matrix : ContainerMatr
             model.Add(sum(matrix.insert[move_counter:next_move_counter]) == 0)
             model.Add(sum(matrix.remove[move_counter:next_move_counter]) == 0)
         
-        move_counter += next_move_counter
+        move_counter = next_move_counter
 
     in_ = 0
     out = 0
@@ -108,27 +167,43 @@ def enforce_container_loading_restrictions(model : Model, matrix : ContainerMatr
     model.Add(sum(matrix.insert) == in_)
     model.Add(sum(matrix.remove) == out)
 
-def enforce_weight_restrictions(model : Model, matrix : ContainerMatrix, weights, index_lookup : dict):
+def enforce_weight_restrictions(model : Model, matrix : ContainerMatrix, constraints, weights, index_lookup : dict):
     weights = {label:1 for label in index_lookup} if weights == False else weights
     weight_array = [0] * len(index_lookup)
 
     for c, weight in weights.items():
         weight_array[index_lookup[c]] = weight
+
+    # Containers are grouped into weight classes, ranked from lightest (1) to heaviest.
+    # Only the relative order matters, so the ranks keep the coefficients small
+    weight_classes = {weight : rank for rank, weight in enumerate(sorted(set(weight_array)), start=1)}
+    if len(weight_classes) <= 1:
+        return # Nothing is lighter than anything else
+
+    class_array = [weight_classes[weight] for weight in weight_array]
+    constraints.weight_order(model, matrix, class_array)
+
+def break_symmetries(model : Model, matrix : ContainerMatrix, constraints, labels, index_lookup, initial_container_positions, shipments, weights, time):
+    occupied_stacks = {stack for _, stack, _ in initial_container_positions}
+    constraints.symmetry_empty_stacks(model, matrix, [s for s in range(matrix.s) if s not in occupied_stacks])
+
+    weights = {label:1 for label in index_lookup} if weights == False else weights
+    initial_containers = [c[0] for c in initial_container_positions]
+
+    groups = {}
+    arrival_windows = {}
+    for container in labels:
+        if container in initial_containers:
+            continue # Their initial positions tell them apart
+        _, in_, _, out, _ = container_lifetime(container, initial_container_positions, shipments, time)
+        key = (weights.get(container, 0), tuple(in_), tuple(out))
+        groups.setdefault(key, []).append(index_lookup[container])
+        arrival_windows[index_lookup[container]] = in_
     
-    for t in range(matrix.t):
-        for s in range(matrix.s):
-            for h in range(matrix.h):
-                for c in range(matrix.c):
-                    container_is_here = model.NewBoolVar('b')
-                    model.AddIf(matrix.get(t, c, s, h) == 1, container_is_here)
-                    model.AddIf(matrix.get(t, c, s, h) == 0, model.Not(container_is_here))
-
-                    for container in range(matrix.c):
-                        for height in range(matrix.h):
-                            if container != c and height < h and weight_array[container] < weight_array[c]:
-                                model.AddIf(matrix.get(t, container, s, height) == 0, container_is_here)
+    constraints.symmetry_identical_containers(model, matrix, [group for group in groups.values() if len(group) > 1], arrival_windows)
 
-def minimize_ship_loading_time(model : Model, matrix : ContainerMatrix, shipments):
+# Works both on idle variables and on the idle flags (0/1) of a plan
+def ship_loading_objective(idle : list, shipments):
     ship_idles = 0
 
     move_counter = 0
@@ -136,89 +211,581 @@ def minimize_ship_loading_time(model : Model, matrix : ContainerMatrix, shipment
         next_move_counter = move_counter+shipment["duration"]
 
         if "in" in shipment:
-            ship_idles += sum(matrix.idle[move_counter:next_move_counter])
+            ship_idles += sum(idle[move_counter:next_move_counter])
         
-        move_counter += next_move_counter
+        move_counter = next_move_counter
 
-    model.Maximize(ship_idles * 100000 + sum(matrix.idle)) # By maximizing the number of idle actions, we minimize emplaces and removes and inserts
+    return ship_idles * 100000 + sum(idle)
 
-def load_from_json(args : object, logs : bool = False, visualize : bool = True) -> dict:
-    with open(args.path) as f:
+def minimize_ship_loading_time(model : Model, matrix : ContainerMatrix, shipments):
+    model.Maximize(ship_loading_objective(matrix.idle, shipments)) # By maximizing the number of idle actions, we minimize emplaces and removes and inserts
+
+# Upper bound on ship_loading_objective from the emplace lower bounds (see EmplaceBounds.py). Removes and inserts
+# always take up ship actions, and so do the emplaces needed by the end of a ship that don't fit in the gaps before it
+def emplace_objective_bound(shipments, bounds : list) -> int:
+    actions = sum(shipment["duration"] for shipment in shipments) - 1
+    moves = sum(len(shipment["in"]) + len(shipment["out"]) for shipment in shipments if "in" in shipment)
+    ship_actions = sum(bound["end"] - bound["start"] for bound in bounds)
+    ship_emplaces = max([bound["emplaces"] - bound["gap_actions"] for bound in bounds] + [0])
+    emplaces = max([bound["emplaces"] for bound in bounds] + [0])
+
+    ship_idles = ship_actions - moves - ship_emplaces
+    idles = actions - moves - emplaces
+    return ship_idles * 100000 + idles
+
+# Redundant with the rest of the model, but the solver would otherwise have to find out by itself how many containers
+# are in the way, which is most of what proving optimality takes
+def enforce_emplace_lower_bounds(model : Model, matrix : ContainerMatrix, shipments, initial_container_positions):
+    bounds = emplace_lower_bounds(initial_container_positions, shipments)
+    for bound in bounds:
+        if bound["emplaces"] > 0:
+            model.Add(sum(matrix.emplace[:bound["end"]]) >= bound["emplaces"])
+
+    objective_bound = emplace_objective_bound(shipments, bounds)
+    model.Add(ship_loading_objective(matrix.idle, shipments) <= objective_bound)
+    return objective_bound
+
+def plan_from_json(data : dict, index_lookup : dict) -> Union[Plan, None]:
+    return greedy_plan(data["containers"], data["shipments"], data["weights"] if "weights" in data else False, index_lookup, *data["dimensions"])
+
+def warm_start(model : Model, matrix : ContainerMatrix, data : dict, index_lookup : dict, logs : bool = False):
+    plan = plan_from_json(data, index_lookup)
+    if plan is None:
+        print_cond(logs, "Greedy heuristic found no plan, solving without hints")
+    else:
+        print_cond(logs, "Hinting the greedy plan")
+        matrix.hint(model, plan)
+
+# Every option that changes the compiled model must be listed here, as it's part of the cache key
+def build_options(args : object) -> dict:
+    return {
+        "formulation": args.formulation,
+        "encoding": args.encoding,
+        "presolve": args.presolve,
+        "symmetry": args.symmetry,
+        "bounds": args.bounds
+    }
+
+def read_input(path : str, logs : bool = False):
+    with open(path) as f:
         data = json.load(f)
         
-        print_cond(logs, "Input file loaded: '" + args.path + "'")
+        print_cond(logs, "Input file loaded: '" + path + "'")
 
-    length, height = data["dimensions"]
-    shipments = data["shipments"]
-    time = sum(shipment["duration"] for shipment in shipments)
-    weights = data["weights"] if "weights" in data else False
+    # Impossible inputs are rejected here, before anything is built or searched
+    check_start = timer()
+    check_input(data)
+    print_cond(logs, f"Input checked in {(timer() - check_start) * 1000:.2f} ms")
 
-    initial_container_positions = data["containers"]
+    return (data, *index_input(data))
 
-    containers = [i[0] for i in initial_container_positions]
-    for shipment in shipments:
+# -check mode: only runs the input checks, and prints every problem found
+def check_from_json(path : str) -> list:
+    with open(path) as f:
+        data = json.load(f)
+
+    check_start = timer()
+    problems = input_problems(data)
+    check_time = (timer() - check_start) * 1000
+
+    for problem in problems:
+        print(f"'{path}': {problem}")
+    print(f"'{path}': {len(problems)} problem(s) found in {check_time:.2f} ms")
+    return problems
+
+def index_input(data : dict):
+    containers = [i[0] for i in data["containers"]]
+    for shipment in data["shipments"]:
         if "in" in shipment:
             containers += shipment["in"]
 
     index_lookup = {label : index for index, label in enumerate(containers)}
-    labels = containers
+    return containers, index_lookup
+
+def build_from_json(args : object, logs : bool = False) -> dict:
+    compiled = build_from_data(args, *read_input(args.path, logs), logs)
+
+    if args.profile:
+        compiled["profile"].print_table()
+    if args.profile_file:
+        matrix = compiled["matrix"]
+        compiled["profile"].save(args.profile_file, instance=args.path, solver=args.solver, options=build_options(args), dimensions={"t": matrix.t, "c": matrix.c, "s": matrix.s, "h": matrix.h})
+        print_cond(logs, f"Build profile written to '{args.profile_file}'")
+    return compiled
+
+def build_from_data(args : object, data : dict, labels : list, index_lookup : dict, logs : bool = False) -> dict:
+    containers = labels
+
+    length, height = data["dimensions"]
+    shipments = data["shipments"]
+    time = sum(shipment["duration"] for shipment in shipments)
+    weights = data["weights"] if "weights" in data else False
+
+    initial_container_positions = data["containers"]
 
     # Model creation phase
     constraint_start = timer()
 
-    model = Model(args.solver)
+    model = Model(args.solver, args.encoding)
+    matrix_class, constraints = FORMULATIONS[args.formulation]
+    profile = BuildProfile(model, enabled=bool(args.profile or args.profile_file))
+
+    if args.cache is not None:
+        cache = ModelCache(args.cache, args.cache_size)
+        cache_key = cache.key(data, args.solver, build_options(args))
+
+        with profile.family("cache load"):
+            metadata = cache.load(cache_key, model)
+            if metadata is not None:
+                matrix = matrix_class(model, *metadata["dimensions"], live=numpy.array(metadata["live"], dtype=bool))
+                model.StopReplay()
+
+        if metadata is not None:
+            print_cond(logs, "Compiled model loaded from cache")
+
+            # Hints aren't part of the cached model
+            if args.hint:
+                with profile.family("hint"):
+                    warm_start(model, matrix, data, index_lookup, logs)
+            profile.stop()
+
+            return {
+                "model": model,
+                "matrix": matrix,
+                "labels": labels,
+                "shipments": shipments,
+                "build_time": timer() - constraint_start,
+                "profile": profile
+            }
+
+    live = None
+    if args.presolve:
+        print_cond(logs, "Trimming the horizon to container lifetimes")
+        with profile.family("presolve"):
+            live = live_windows(labels, initial_container_positions, shipments, time)
+
     print_cond(logs, "Generating matrix")
-    matrix = ContainerMatrix(model, time, len(containers), length, height)
+    with profile.family("matrix"):
+        matrix = matrix_class(model, time, len(containers), length, height, live)
 
     # Constraint application phase
 
     print_cond(logs, "Implementing matrix constraints")
-    constraints = getmembers(Constraints, isfunction)
-    for _, constraint in constraints: 
+    families = [(name, constraint) for name, constraint in getmembers(constraints, isfunction) if not name.startswith(("weight_", "symmetry_"))]
+    for _, constraint in families: 
         print_cond(logs, _, end=" ", flush=True)
-        constraint(model, matrix)
+        with profile.family(_):
+            constraint(model, matrix)
     print_cond(logs)
+    print_cond(logs, f"Reified literals: {model.literal_misses} created, {model.literal_hits} reused")
 
     print_cond(logs, "Setting initial container positions")
-    for container, (label, stack, height) in enumerate(initial_container_positions):
-        model.Add(matrix.get(0, container, stack, height) == 1)
+    with profile.family("initial positions"):
+        for container, (label, stack, height) in enumerate(initial_container_positions):
+            model.Add(matrix.get(0, container, stack, height) == 1)
     
     print_cond(logs, "Setting initial container lifetime")
-    for i, container in enumerate(containers):
-        if container in [i[0] for i in initial_container_positions]:
-            model.Add(matrix.lifetime[0][i] == 1)
-        else:
-            model.Add(matrix.lifetime[0][i] == 0)
+    with profile.family("initial lifetime"):
+        for i, container in enumerate(containers):
+            if container in [i[0] for i in initial_container_positions]:
+                model.Add(matrix.lifetime[0][i] == 1)
+            else:
+                model.Add(matrix.lifetime[0][i] == 0)
 
     print_cond(logs, "Enforcing container lifetime restrictions")
-    enforce_container_lifetime_restrictions(model, matrix, labels, index_lookup, initial_container_positions, shipments, time)
+    with profile.family("lifetime"):
+        enforce_container_lifetime_restrictions(model, matrix, labels, index_lookup, initial_container_positions, shipments, time)
 
     print_cond(logs, "Enforcing container movement restrictions")
-    enforce_container_loading_restrictions(model, matrix, shipments)
+    with profile.family("loading"):
+        enforce_container_loading_restrictions(model, matrix, shipments)
+
+    if args.bounds:
+        print_cond(logs, "Enforcing emplace lower bounds")
+        with profile.family("bounds"):
+            objective_bound = enforce_emplace_lower_bounds(model, matrix, shipments, initial_container_positions)
+        print_cond(logs, f"Objective bound from blocking containers: {objective_bound}")
 
     print_cond(logs, "Enforcing weight restrictions")
-    enforce_weight_restrictions(model, matrix, weights, index_lookup)
+    with profile.family("weight"):
+        enforce_weight_restrictions(model, matrix, constraints, weights, index_lookup)
     
-    minimize_ship_loading_time(model, matrix, shipments)
+    if args.symmetry:
+        print_cond(logs, "Breaking symmetries")
+        with profile.family("symmetry"):
+            break_symmetries(model, matrix, constraints, labels, index_lookup, initial_container_positions, shipments, weights, time)
+
+    with profile.family("objective"):
+        minimize_ship_loading_time(model, matrix, shipments)
+
+    if args.cache is not None:
+        print_cond(logs, "Storing compiled model in cache")
+        with profile.family("cache store"):
+            cache.store(cache_key, model, {"dimensions": [matrix.t, matrix.c, matrix.s, matrix.h], "live": matrix.live.tolist()})
+
+    if args.hint:
+        with profile.family("hint"):
+            warm_start(model, matrix, data, index_lookup, logs)
     
     constraint_end = timer()
-    # Solve and result phas
+    profile.stop()
+
+    return {
+        "model": model,
+        "matrix": matrix,
+        "labels": labels,
+        "shipments": shipments,
+        "build_time": constraint_end - constraint_start,
+        "profile": profile
+    }
+
+def search_options(args : object) -> dict:
+    return {
+        "seed": args.seed,
+        "workers": args.workers,
+        "lns": args.lns,
+        "portfolio": args.portfolio,
+        "parameters": dict(args.param) if args.param else None
+    }
+
+def export_plan(args : object, plan : Plan, labels : list, shipments : list, logs : bool = False):
+    if args.export is None:
+        return
+    if args.export.endswith(".jsonl"):
+        save_moves(args.export, plan, labels)
+    else:
+        save_plan(args.export, plan, labels, shipments)
+    print_cond(logs, f"Plan exported to '{args.export}'")
+
+# Reports each improving solution as -progress and -progress-file ask. Returns report(intermediate, decisions), where
+# decisions is only called if they're written, and the progress file for the caller to close. report is None if unused
+def progress_reporter(args : object):
+    if not (args.progress or args.progress_file):
+        return None, None
+    progress_file = open(args.progress_file, "w") if args.progress_file else None
+
+    def report(intermediate : dict, decisions):
+        print_cond(args.progress, f"Solution {intermediate['solution']}: objective {intermediate['objective']}, bound {intermediate['bound']}, time (s) {intermediate['time']:.3f}", flush=True)
+        if progress_file:
+            # Each line is a complete plan, so the file can be read while the solver is still running
+            progress_file.write(json.dumps({**intermediate, "decisions": decisions()}) + "\n")
+            progress_file.flush()
+    return report, progress_file
 
-    solution = model.Solve(args.time, args.execfile)
+def solve_compiled(compiled : dict, args : object, logs : bool = False, visualize : bool = True, **overrides) -> dict:
+    # The compiled model is left untouched by solving, so it can be solved again with different parameters
+    model, matrix, labels, shipments = compiled["model"], compiled["matrix"], compiled["labels"], compiled["shipments"]
+
+    report, progress_file = progress_reporter(args)
+    on_solution = None if report is None else lambda intermediate: report(intermediate, lambda: matrix.decisions(model))
+
+    solution = model.Solve(args.time, args.execfile, on_solution=on_solution, **{**search_options(args), **overrides})
+    if progress_file:
+        progress_file.close()
 
     if solution['status'] == model.OPTIMAL or solution['status'] == model.FEASIBLE:
+        if logs or visualize or args.export:
+            plan = matrix.plan(model)
         if logs:
             print('Solution time (s):', solution['time'])
             print('Objective value:', solution['objective'], 'OPTIMAL' if solution['status'] == model.OPTIMAL else '')
-            matrix.print_solution(model, labels=labels)
+            plan.print_solution(labels=labels)
+        if args.export:
+            export_plan(args, plan, labels, shipments, logs)
         if visualize:
-            matrix.visualize(model, shipments, labels=labels)
+            plan.visualize(shipments, labels=labels)
 
-        print("Solver: ", args.solver, "Constraint Time: ", constraint_end-constraint_start, solution)
+        print("Solver: ", args.solver, "Constraint Time: ", compiled["build_time"], solution)
     else:
         print("No feasible solution found")
     
     return solution
+
+def solve_planner(args : object, logs : bool = False, visualize : bool = True) -> dict:
+    data, labels, index_lookup = read_input(args.path, logs)
+
+    start = timer()
+    if args.solver == 'search':
+        plan = search_plan(data["containers"], data["shipments"], data["weights"] if "weights" in data else False, index_lookup, *data["dimensions"], args.beam, args.time)
+    else:
+        plan = plan_from_json(data, index_lookup)
+    end = timer()
+
+    if plan is None:
+        print("No feasible solution found")
+        return {"status": None, "time": end - start, "objective": None}
+    
+    solution = {
+        # Only the exhaustive search proves its plan is the best one
+        "status": "OPTIMAL" if args.solver == 'search' and args.beam is None else "FEASIBLE",
+        "time": end - start,
+        "objective": ship_loading_objective((plan.actions == IDLE).tolist(), data["shipments"])
+    }
+    if logs:
+        print('Solution time (s):', solution['time'])
+        print('Objective value:', solution['objective'], 'OPTIMAL' if solution['status'] == "OPTIMAL" else '')
+        plan.print_solution(labels=labels)
+    export_plan(args, plan, labels, data["shipments"], logs)
+    if visualize:
+        plan.visualize(data["shipments"], labels=labels)
+
+    print("Solver: ", args.solver, solution)
+    return solution
+
+# The better of the greedy plan and of a beam search of width 1, which both take milliseconds. None if neither finds one
+def starting_plan(data : dict, index_lookup : dict, max_time : float = None) -> Union[Plan, None]:
+    weights = data["weights"] if "weights" in data else False
+    plans = [plan_from_json(data, index_lookup), search_plan(data["containers"], data["shipments"], weights, index_lookup, *data["dimensions"], 1, max_time)]
+    plans = [plan for plan in plans if plan is not None]
+    return max(plans, key=lambda plan: ship_loading_objective((plan.actions == IDLE).tolist(), data["shipments"]), default=None)
+
+# Large neighbourhood search (see LNS.py), starting from the starting_plan. The plan isn't proven optimal
+def solve_lns(args : object, logs : bool = False, visualize : bool = True) -> dict:
+    if args.formulation != 'grid':
+        raise Exception("The neighbourhood search only supports the 'grid' formulation")
+    if args.time is None:
+        raise Exception("The neighbourhood search needs a time limit (-time)")
+
+    data, labels, index_lookup = read_input(args.path, logs)
+
+    start = timer()
+    plan = starting_plan(data, index_lookup, args.time)
+    if plan is None:
+        print("No feasible solution found")
+        return {"status": None, "time": timer() - start, "objective": None}
+    objective = ship_loading_objective((plan.actions == IDLE).tolist(), data["shipments"])
+    print_cond(logs, f"Initial plan: objective {objective}, time (s) {timer() - start:.3f}")
+
+    report, progress_file = progress_reporter(args)
+    improvements = [0]
+    def on_improvement(improvement, plan):
+        improvements[0] += 1
+        print_cond(logs and not args.progress, f"Neighbourhood '{improvement['neighbourhood']}': objective {improvement['objective']}, time (s) {improvement['time']:.3f}", flush=True)
+        if report is not None:
+            report({**improvement, "solution": improvements[0], "bound": None}, plan.decisions)
+
+    # Every process builds its own model, and the CPUs are split between them unless -workers says otherwise
+    threads = args.workers if args.workers is not None else max(1, os.cpu_count() // args.processes)
+    model_args = argparse.Namespace(**{**vars(args), "hint": False})
+    best = lns_search(build_from_json, model_args, plan, objective, args.neighbourhoods, args.time - (timer() - start), args.neighbourhood_time,
+        args.processes, threads, args.seed, on_improvement)
+    if progress_file:
+        progress_file.close()
+
+    plan = best["plan"]
+    solution = {
+        "status": "FEASIBLE",
+        "time": timer() - start,
+        "objective": best["objective"]
+    }
+    if logs:
+        print('Neighbourhoods solved:', best["neighbourhoods"])
+        print('Solution time (s):', solution['time'])
+        print('Objective value:', solution['objective'])
+        plan.print_solution(labels=labels)
+    export_plan(args, plan, labels, data["shipments"], logs)
+    if visualize:
+        plan.visualize(data["shipments"], labels=labels)
+
+    print("Solver: ", args.solver, solution)
+    return solution
+
+# Splits the shipments into windows of k ships each. Gaps are planned together with the ship after them, since
+# that's the ship they prepare the yard for, and trailing gaps are added to the last window
+def rolling_windows(shipments : list, k : int) -> list:
+    windows = []
+    pending = []
+    ships = 0
+    for shipment in shipments:
+        pending.append(shipment)
+        if "in" in shipment:
+            if windows and ships < k:
+                windows[-1] += pending
+            else:
+                windows.append(pending)
+                ships = 0
+            pending = []
+            ships += 1
+
+    if pending:
+        if windows:
+            windows[-1] += pending
+        else:
+            windows.append(pending)
+    return windows
+
+# Rolling horizon: every window of shipments is built and solved on its own, starting from the final yard state of
+# the window before it. Each window after the first gets one extra timestep up front, the action between the
+# windows, so the joined plan covers the same timeline as the monolithic model. The plan isn't proven optimal
+def solve_rolling(args : object, logs : bool = False, visualize : bool = True) -> dict:
+    data, labels, index_lookup = read_input(args.path, logs)
+
+    containers = data["containers"]
+    weights = data["weights"] if "weights" in data else None
+    plans = []
+    build_time = 0
+    solve_time = 0
+
+    for i, window in enumerate(rolling_windows(data["shipments"], args.rolling)):
+        if i > 0:
+            # The extra timestep goes to the window's leading gap, or is a gap of its own
+            window = [{**window[0], "duration": window[0]["duration"] + 1}] + window[1:] if "in" not in window[0] else [{"duration": 1}] + window
+
+        window_data = {"containers": containers, "dimensions": data["dimensions"], "shipments": window}
+        window_labels, window_lookup = index_input(window_data)
+        if weights is not None:
+            window_data["weights"] = {label : weight for label, weight in weights.items() if label in window_lookup}
+
+        compiled = build_from_data(args, window_data, window_labels, window_lookup)
+        model = compiled["model"]
+        solution = model.Solve(args.time, args.execfile, **search_options(args))
+        build_time += compiled["build_time"]
+        solve_time += solution["time"]
+
+        if solution['status'] != model.OPTIMAL and solution['status'] != model.FEASIBLE:
+            print(f"No feasible solution found for window {i}")
+            return {"status": None, "time": solve_time, "objective": None}
+
+        print_cond(logs, f"Window {i}: {len(window)} shipments, {compiled['matrix'].t} timesteps, objective {solution['objective']}{' OPTIMAL' if solution['status'] == model.OPTIMAL else ''}, time (s) {solution['time']:.3f}")
+
+        # Container indices are local to each window, and are mapped back to the ones of the whole input
+        plan = compiled["matrix"].plan(model).relabel([index_lookup[label] for label in window_labels], len(labels))
+        plans.append(plan)
+
+        containers = [[labels[container], s, h] for (s, h), container in numpy.ndenumerate(plan.grid[-1]) if container != EMPTY]
+
+    plan = concatenate(plans)
+    solution = {
+        "status": "FEASIBLE",
+        "time": solve_time,
+        "objective": ship_loading_objective((plan.actions == IDLE).tolist(), data["shipments"])
+    }
+    if logs:
+        print('Solution time (s):', solution['time'])
+        print('Objective value:', solution['objective'])
+        plan.print_solution(labels=labels)
+    export_plan(args, plan, labels, data["shipments"], logs)
+    if visualize:
+        plan.visualize(data["shipments"], labels=labels)
+
+    print("Solver: ", args.solver, "Constraint Time: ", build_time, solution)
+    return solution
+
+# A manifest diff is a list of changes like {"shipment": 3, "in": {"add": ["X"], "drop": ["B"]}, "out": {"add": [...], "drop": [...]}},
+# where shipment indexes the input's shipments. New containers may be given a "weights" entry
+def apply_manifest_diff(data : dict, diff : list) -> dict:
+    data = {**data, "shipments": [dict(shipment) for shipment in data["shipments"]]}
+    for change in diff:
+        shipment = data["shipments"][change["shipment"]]
+        if "in" not in shipment:
+            raise Exception(f"Shipment {change['shipment']} is a gap, it has no manifest")
+
+        for movement in ("in", "out"):
+            if movement in change:
+                dropped = change[movement].get("drop", [])
+                shipment[movement] = [c for c in shipment[movement] if c not in dropped] + change[movement].get("add", [])
+
+        if "weights" in change:
+            data["weights"] = {**data.get("weights", {}), **change["weights"]}
+    return data
+
+# Incremental re-planning: the plan is kept up to the first timestep affected by the diff (the gaps leading up to
+# the earliest changed ship), or up to the executed timesteps if that's later. Only the suffix after it is rebuilt,
+# starting from the yard of the old plan, and is hinted with the old plan. Returns the new input, plan and solution
+def replan(args : object, data : dict, plan : Plan, diff : list, executed : int = 0, logs : bool = False):
+    _, index_lookup = index_input(data)
+    new_data = apply_manifest_diff(data, diff)
+    check_input(new_data)
+    new_labels, new_lookup = index_input(new_data)
+    shipments = new_data["shipments"]
+
+    starts = numpy.cumsum([0] + [shipment["duration"] for shipment in shipments])
+    first_change = min(change["shipment"] for change in diff)
+    if executed > starts[first_change]:
+        raise Exception(f"Shipment {first_change} has already started at timestep {starts[first_change]}, it can't be changed anymore")
+
+    first_gap = first_change
+    while first_gap > 0 and "in" not in shipments[first_gap - 1]:
+        first_gap -= 1
+    start = max(starts[first_gap], executed)
+
+    # Old container indices are mapped to the new input's, dropped containers can't be in the kept prefix
+    to_new = [new_lookup.get(label, EMPTY) for label in index_lookup]
+    prefix = plan.between(0, start + 1).relabel(to_new, len(new_labels))
+
+    # The suffix starts in the middle of the shipment holding the start, which is always a gap or the changed ship
+    current = numpy.searchsorted(starts, start, side="right") - 1
+    suffix_shipments = [{**shipments[current], "duration": starts[current + 1] - start}] + shipments[current + 1:]
+    suffix_data = {
+        "containers": [[new_labels[container], s, h] for (s, h), container in numpy.ndenumerate(prefix.grid[-1]) if container != EMPTY],
+        "dimensions": new_data["dimensions"],
+        "shipments": suffix_shipments
+    }
+    suffix_labels, suffix_lookup = index_input(suffix_data)
+    if "weights" in new_data:
+        suffix_data["weights"] = {label : weight for label, weight in new_data["weights"].items() if label in suffix_lookup}
+
+    print_cond(logs, f"Re-planning timesteps {start} to {plan.t - 1}, from shipment {current}")
+
+    # The old plan is the hint, instead of the greedy one
+    compiled = build_from_data(argparse.Namespace(**{**vars(args), "hint": False}), suffix_data, suffix_labels, suffix_lookup)
+    model, matrix = compiled["model"], compiled["matrix"]
+    matrix.hint(model, plan.between(start).relabel([suffix_lookup.get(label, EMPTY) for label in index_lookup], len(suffix_labels)))
+
+    solution = model.Solve(args.time, args.execfile, **search_options(args))
+    solution["build_time"] = compiled["build_time"]
+    if solution['status'] != model.OPTIMAL and solution['status'] != model.FEASIBLE:
+        return new_data, None, solution
+
+    suffix = matrix.plan(model).relabel([new_lookup[label] for label in suffix_labels], len(new_labels))
+    new_plan = concatenate([prefix, suffix])
+    solution["objective"] = ship_loading_objective((new_plan.actions == IDLE).tolist(), shipments)
+    return new_data, new_plan, solution
+
+def solve_replan(args : object, logs : bool = False, visualize : bool = True) -> dict:
+    if args.solver in PLANNERS:
+        raise Exception("Re-planning needs a model, use 'ortools' or 'cplex'")
+
+    with open(args.replan) as f:
+        diff = json.load(f)
+
+    # The plan being changed, found the usual way
+    compiled = build_from_json(args, logs)
+    model = compiled["model"]
+    solution = model.Solve(args.time, args.execfile, **search_options(args))
+    if solution['status'] != model.OPTIMAL and solution['status'] != model.FEASIBLE:
+        print("No feasible solution found")
+        return solution
+    print("Initial plan: Constraint Time: ", compiled["build_time"], solution)
+
+    data, _, _ = read_input(args.path)
+    data, plan, solution = replan(args, data, compiled["matrix"].plan(model), diff, args.executed, logs)
+    if plan is None:
+        print("No feasible solution found")
+        return solution
+
+    labels, _ = index_input(data)
+    if logs:
+        print('Solution time (s):', solution['time'])
+        print('Objective value:', solution['objective'])
+        plan.print_solution(labels=labels)
+    export_plan(args, plan, labels, data["shipments"], logs)
+    if visualize:
+        plan.visualize(data["shipments"], labels=labels)
+
+    print("Re-plan: Constraint Time: ", solution["build_time"], solution)
+    return solution
+
+def load_from_json(args : object, logs : bool = False, visualize : bool = True) -> dict:
+    if args.solver in PLANNERS:
+        return solve_planner(args, logs, visualize)
+    if args.rolling:
+        return solve_rolling(args, logs, visualize)
+    if args.replan:
+        return solve_replan(args, logs, visualize)
+    if args.neighbourhoods:
+        return solve_lns(args, logs, visualize)
+    return solve_compiled(build_from_json(args, logs), args, logs, visualize)
     
     
 if __name__ == '__main__':
@@ -227,9 +794,23 @@ if __name__ == '__main__':
     my_parser.add_argument('-solver',
         metavar='--solver-package',
         type=str,
-        required=True,
-        choices=['ortools', 'cplex'],
-        help="choice of solver to solve input problem. Currently supports 'ortools' and 'cplex'")
+        default=None,
+        choices=list(BACKENDS) + PLANNERS,
+        help="choice of solver to solve input problem, required unless -check. Currently supports 'ortools', 'cplex' (or any other registered backend), 'greedy' (a constructive heuristic, no optimality) and 'search' (A* or beam search over yard states)")
+
+    my_parser.add_argument('-formulation',
+        metavar='--model-formulation',
+        type=str,
+        default='grid',
+        choices=list(FORMULATIONS),
+        help="how the yard is modelled. 'grid' has a binary cell for every container and place, 'position' has the place of every container as an integer. By default is 'grid'")
+
+    my_parser.add_argument('-encoding',
+        metavar='--variable-encoding',
+        type=str,
+        default='integer',
+        choices=['integer', 'boolean'],
+        help="how binary matrix cells are declared. 'boolean' uses native boolean variables as enforcement literals. By default is 'integer'")
 
     my_parser.add_argument('-path',
         metavar='--input-path',
@@ -237,6 +818,10 @@ if __name__ == '__main__':
         default='inputs/input.json',
         help="the path to the file with the input problem (.json). By default is 'inputs/input.json'")
 
+    my_parser.add_argument('-check',
+        action='store_true',
+        help="only check the input for problems that make it infeasible (capacity, moves per shipment, container labels, weights), print them and exit with status 1 if there are any. Every run does these checks before building")
+
     my_parser.add_argument('-benchmark',
         metavar='--benchmark-runs',
         nargs='?',
@@ -258,17 +843,201 @@ if __name__ == '__main__':
         default=None,
         help="path for the CPLEX engine's executable. By default is '/opt/ibm/ILOG/CPLEX_Studio201/cpoptimizer/bin/x86-64_linux/cpoptimizer'"
         )
+
+    my_parser.add_argument('-presolve',
+        action='store_true',
+        help="only create occupancy variables inside each container's lifetime window, derived from the shipments")
+
+    my_parser.add_argument('-symmetry',
+        action='store_true',
+        help="add symmetry breaking constraints for initially empty stacks and interchangeable containers")
+
+    my_parser.add_argument('-bounds',
+        action='store_true',
+        help="add redundant lower bounds on the emplaces needed by each ship, from the containers initially stacked on ones leaving before them, and the objective bound they imply")
+
+    my_parser.add_argument('-hint',
+        action='store_true',
+        help="warm start the solver with the plan found by the greedy heuristic")
+
+    my_parser.add_argument('-beam',
+        metavar='--beam-width',
+        type=positive_int,
+        default=None,
+        help="with the 'search' solver, only expand this many of the most promising yard states at each timestep (beam search, no optimality). By default is A*, which proves optimality")
+
+    my_parser.add_argument('-rolling',
+        metavar='--window-ships',
+        type=positive_int,
+        default=None,
+        help="rolling horizon: solve the shipments in windows of this many ships, each starting from the final yard of the previous one. Not proven optimal")
+
+    my_parser.add_argument('-replan',
+        metavar='--manifest-diff',
+        type=str,
+        default=None,
+        help="solve the input, then re-plan it incrementally after the manifest changes in this file (.json), e.g. [{\"shipment\": 3, \"in\": {\"add\": [\"X\"], \"drop\": [\"B\"]}}]")
+
+    my_parser.add_argument('-executed',
+        metavar='--executed-timesteps',
+        type=positive_int,
+        default=0,
+        help="when re-planning, the plan up to this timestep has already been carried out and is kept. By default is 0")
+
+    my_parser.add_argument('-neighbourhoods',
+        metavar='--neighbourhood-kinds',
+        type=str,
+        nargs='+',
+        choices=NEIGHBOURHOODS,
+        default=None,
+        help="large neighbourhood search around the model: starting from a quick heuristic plan, repeatedly re-solve a time window, some stacks or some containers of the best plan, with the rest fixed, until -time runs out. Not proven optimal")
+
+    my_parser.add_argument('-neighbourhood-time',
+        metavar='--subsolve-time',
+        type=positive_float,
+        default=2,
+        help="time limit (in seconds) of each neighbourhood re-solve. By default is 2")
+
+    my_parser.add_argument('-processes',
+        metavar='--worker-processes',
+        type=strictly_positive_int,
+        default=1,
+        help="number of neighbourhoods re-solved at the same time, each by its own process with its own copy of the model. By default is 1")
+
+    my_parser.add_argument('-workers',
+        metavar='--search-workers',
+        type=positive_int,
+        default=None,
+        help="number of parallel search workers (CP-SAT num_workers, CPLEX Workers). By default the solver decides")
+
+    my_parser.add_argument('-seed',
+        metavar='--random-seed',
+        type=positive_int,
+        default=None,
+        help="random seed of the search")
+
+    my_parser.add_argument('-lns',
+        metavar='--lns-mode',
+        type=str,
+        default=None,
+        choices=['off', 'only'],
+        help="large neighbourhood search: 'off' disables it, 'only' uses nothing else (CPLEX: DepthFirst/Restart search). By default the solver decides")
+
+    my_parser.add_argument('-portfolio',
+        metavar='--subsolver',
+        type=str,
+        nargs='+',
+        default=None,
+        help="CP-SAT subsolvers making up the parallel search portfolio, e.g. 'default_lp fixed core no_lp quick_restart'. Only supported by ortools")
+
+    my_parser.add_argument('-param',
+        metavar='--solver-parameter',
+        type=solver_parameter,
+        action='append',
+        default=None,
+        help="raw solver parameter as name=value, passed to CP-SAT's SatParameters or CPLEX's CpoParameters. Can be repeated")
+
+    my_parser.add_argument('-sweep-workers',
+        metavar='--worker-counts',
+        type=positive_int,
+        nargs='+',
+        default=None,
+        help="in benchmark mode, repeat the runs for each of these worker counts and report the scaling efficiency")
+
+    my_parser.add_argument('-progress',
+        action='store_true',
+        help="print every improving solution found during the search, with its objective, bound and time")
+
+    my_parser.add_argument('-progress-file',
+        metavar='--progress-path',
+        type=str,
+        default=None,
+        help="write every improving solution found during the search to this file (.jsonl), including its decisions")
+
+    my_parser.add_argument('-export',
+        metavar='--plan-path',
+        type=str,
+        default=None,
+        help="write the plan to this file: a move list if it ends in '.jsonl', a memory-mappable binary plan (see PlanFile.py) otherwise")
+
+    my_parser.add_argument('-profile',
+        action='store_true',
+        help="print the build time, variables, constraints and peak traced memory of each constraint family. Slows the build down")
+
+    my_parser.add_argument('-profile-file',
+        metavar='--profile-path',
+        type=str,
+        default=None,
+        help="write the build profile of each constraint family to this file (.json)")
+
+    my_parser.add_argument('-cache',
+        metavar='--cache-directory',
+        nargs='?',
+        type=str,
+        default=None,
+        const='.model_cache',
+        help="reuse compiled models stored in this directory, keyed by input file and build options. By default caching is disabled; '-cache' alone uses '.model_cache'")
+
+    my_parser.add_argument('-cache-size',
+        metavar='--cache-max-size',
+        type=positive_float,
+        default=512,
+        help="maximum size (in MB) of the compiled model cache, least recently used models are evicted first. By default is 512")
     args = my_parser.parse_args()
+    # -check never solves, so it's the only mode that doesn't need a solver
+    if args.solver is None and not args.check:
+        my_parser.error("the following arguments are required: -solver")
+
+    if args.check:
+        if check_from_json(args.path):
+            sys.exit(1)
 
-    if args.benchmark == 0:
+    elif args.benchmark == 0:
         load_from_json(args, logs=True, visualize=True)
 
     else:
-        import timeit
         print("Solver [", args.solver, "]")
         print("Number runs [", args.benchmark, "]")
 
-        t = timeit.Timer(lambda: load_from_json(args, logs=False, visualize=False)['status'])
-        print("Avg time (s)", t.timeit(number=args.benchmark)/args.benchmark)
-        # (total_time, sol) = t.timeit(args.benchmark)
-        # print("Time avg(s): ", total_time/args.benchmark)
+        # Interpreter start and module imports, up to here. The solver library is loaded (and timed) on its own,
+        # so that it isn't counted as build time
+        print("Startup CPU time (s)", time.process_time())
+        if args.solver not in PLANNERS:
+            import_start = timer()
+            load_backend(args.solver)
+            print("Solver import time (s)", timer() - import_start)
+
+        if args.solver in PLANNERS or args.rolling or args.replan or args.neighbourhoods:
+            # There's no single model to build, every run starts from the input
+            solve = solve_planner if args.solver in PLANNERS else solve_rolling if args.rolling else solve_replan if args.replan else solve_lns
+            solve_times = [solve(args, logs=False, visualize=False)['time'] for run in range(args.benchmark)]
+            print("Solve times (s)", solve_times)
+            print("Avg solve time (s)", sum(solve_times)/args.benchmark)
+
+        else:
+            # The model is only built once, so the solve times aren't polluted by the build cost
+            compiled = build_from_json(args, logs=False)
+            print("Build time (s)", compiled["build_time"])
+
+            worker_counts = args.sweep_workers if args.sweep_workers else [args.workers]
+            average_solve_times = []
+
+            for workers in worker_counts:
+                solve_times = []
+                for run in range(args.benchmark):
+                    solve_start = timer()
+                    solve_compiled(compiled, args, logs=False, visualize=False, workers=workers)
+                    solve_times.append(timer() - solve_start)
+                average_solve_times.append(sum(solve_times)/args.benchmark)
+
+                print_cond(bool(args.sweep_workers), f"Workers [ {workers} ]")
+                print("Solve times (s)", solve_times)
+                print("Avg solve time (s)", average_solve_times[-1])
+
+            if args.sweep_workers:
+                print("Workers | Avg solve time (s) | Speedup | Efficiency")
+                for workers, solve_time in zip(worker_counts, average_solve_times):
+                    # Relative to the first worker count of the sweep
+                    speedup = average_solve_times[0] / solve_time
+                    efficiency = speedup * worker_counts[0] / workers
+                    print(f"{workers:7} | {solve_time:18.4f} | {speedup:7.2f} | {efficiency:10.2f}")
@@ -0,0 +1,35 @@
+import numpy
+
+from Plan import Plan, EMPTY, EMPLACE, IDLE
+from PlanFile import save_plan, load_plan
+
+def round_trip(tmp_path, plan : Plan) -> Plan:
+    path = str(tmp_path / "plan.bin")
+    save_plan(path, plan, ["A"], [{"duration": plan.t}])
+    loaded, header = load_plan(path)
+    assert header["labels"] == ["A"]
+    return loaded
+
+def assert_same_plan(loaded : Plan, plan : Plan):
+    for name in ("grid", "actions", "moves"):
+        assert getattr(loaded, name).shape == getattr(plan, name).shape
+        assert numpy.array_equal(getattr(loaded, name), getattr(plan, name))
+    assert loaded.c == plan.c
+
+def test_round_trip(tmp_path):
+    grid = numpy.full((3, 2, 2), EMPTY, dtype=numpy.int16)
+    grid[:2, 0, 0] = 0
+    grid[2, 1, 0] = 0
+    actions = numpy.array([IDLE, EMPLACE], dtype=numpy.int8)
+    moves = numpy.array([[EMPTY] * 4, [0, 0, 1, 0]], dtype=numpy.int16)
+    plan = Plan(grid, actions, moves, 1)
+
+    assert_same_plan(round_trip(tmp_path, plan), plan)
+
+# A single timestep has no actions, so the last arrays of the file are empty
+def test_round_trip_without_moves(tmp_path):
+    grid = numpy.full((1, 2, 2), EMPTY, dtype=numpy.int16)
+    grid[0, 0, 0] = 0
+    plan = Plan(grid, numpy.zeros(0, dtype=numpy.int8), numpy.zeros((0, 4), dtype=numpy.int16), 1)
+
+    assert_same_plan(round_trip(tmp_path, plan), plan)